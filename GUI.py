@@ -1,21 +1,51 @@
 """Main file for starting the GUI."""
 
+# the launch time is taken before the imports, which are part of the startup
+# ruff: noqa: E402
+import time
+
+t_launch = time.perf_counter()
+
+import argparse
+from functools import partial
 from pathlib import Path
 
 import wx
 
-import MWF
 from comp.mainframe import MainFrame
+from functions import profiler
 from functions.my_exceptions import SourceNumberError
 
+t_import = time.perf_counter()
+
 
 class AppMWF(wx.App):
     """
     Main class inherited from wx.App.
 
     Initialize MWF object and generate mainframe instance here.
+
+    The frame is shown first and the pipeline runs on the worker thread of the
+    frame; the spectrogram of the observation and the parameter panel appear
+    as their results are ready. The time of each step since launch, including
+    the imports (MWF and the panels are imported when first needed), is
+    recorded in self.startup, and printed once the GUI is complete with
+    startup_report or profiling enabled (MWF_PROFILE=1).
     """
 
+    def __init__(
+        self,
+        startup_report: bool = False,
+        stft_cache: str | None = ".cache/stft",
+        stft_cache_bytes: int = 2**30,
+    ) -> None:
+        self.exit_when_ready = startup_report
+        self.verbose = startup_report or profiler.is_enabled()
+        self.stft_cache = stft_cache
+        self.stft_cache_bytes = stft_cache_bytes
+        self.startup = [("imports (wx, mainframe)", t_import)]
+        super().__init__()
+
     def OnInit(self) -> None:
         # load
         target_dir = Path("wav/target")
@@ -27,31 +57,115 @@ class AppMWF(wx.App):
         if len(target_path) != 1:
             raise SourceNumberError("target", 1)
 
-        # prepare MWF
-        self.mwfo = MWF.MWF()
-        self.mwfo.load_data(target_path[0], interf_paths, snr=10)
-        self.mwfo.transform(self.mwfo.train)
-        self.mwfo.transform(self.mwfo.test)
-        self.mwfo.calc_features()
-        self.mwfo.filter_init()
-        self.mwfo.run()
-        self.mwfo.inv_transform()
-        self.mwfo.calc_spectrogram()
-
         # generate GUI
-        frame = MainFrame(self.mwfo)
+        import MWF
+
+        self.stamp("import MWF")
+        self.mwfo = MWF.MWF(
+            stft_cache=self.stft_cache, stft_cache_bytes=self.stft_cache_bytes
+        )
+        self.frame = MainFrame(self.mwfo)
 
         # set event
-        frame.Bind(wx.EVT_CLOSE, self.ExitHandler)
+        self.frame.Bind(wx.EVT_CLOSE, self.ExitHandler)
 
         # show GUI
-        frame.Show()
+        self.frame.Show()
+        self.stamp("frame shown")
+
+        # prepare MWF in the background
+        mwfo = self.mwfo
+        load = partial(mwfo.load_data, target_path[0], interf_paths, snr=10)
+        self.frame.worker.submit(
+            "input",
+            self.stage("load_data", load),
+            self.stage("transform (train)", lambda: mwfo.transform(mwfo.train)),
+            self.stage("transform (test)", lambda: mwfo.transform(mwfo.test)),
+            self.stage("calc_features", mwfo.calc_features),
+            self.stage("filter_init", mwfo.filter_init),
+            self.stage("calc_spectrogram (x)", mwfo.calc_spectrogram),
+            callback=self.show_input,
+        )
+        self.frame.worker.submit(
+            "output",
+            self.stage("run", mwfo.run),
+            self.stage("inv_transform", mwfo.inv_transform),
+            self.stage("calc_spectrogram (y)", mwfo.calc_spectrogram),
+            callback=self.show_output,
+        )
         return True
 
+    def stage(self, name: str, func):
+        """Wrap a step of the pipeline to report its progress."""
+
+        def run() -> None:
+            wx.CallAfter(self.frame.set_status, f"{name}...")
+            func()
+            self.stamp(name)
+
+        return run
+
+    def stamp(self, name: str) -> None:
+        self.startup.append((name, time.perf_counter()))
+
+    def show_input(self, result) -> None:
+        # timed separately, show_plot reuses the imported module
+        import comp.plot_panel  # noqa: F401
+
+        self.stamp("import plot_panel")
+        self.frame.show_plot()
+        self.stamp("plot shown")
+
+    def show_output(self, result) -> None:
+        # timed separately, show_params reuses the imported module
+        import comp.parameter_panel  # noqa: F401
+
+        self.stamp("import parameter_panel")
+        self.frame.show_params()
+        self.stamp("parameters shown")
+
+        if self.verbose:
+            print(self.report())
+        if self.exit_when_ready:
+            self.frame.Close()
+
+    def report(self) -> str:
+        """Summarize the startup time of each step."""
+        lines = ["startup time [ms]: since launch (step)"]
+        prev = t_launch
+        for name, t in self.startup:
+            since, step = (t - t_launch) * 1e3, (t - prev) * 1e3
+            lines.append(f"  {name:<24} {since:9.1f} ({step:.1f})")
+            prev = t
+        return "\n".join(lines)
+
     def ExitHandler(self, evt) -> None:
+        if self.verbose and hasattr(self.frame.p_plot, "report"):
+            print(self.frame.p_plot.report())
         evt.Skip()
 
 
 if __name__ == "__main__":
-    app = AppMWF()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="print the startup time report and exit once the GUI is ready",
+    )
+    parser.add_argument(
+        "--stft-cache", default=".cache/stft", help="directory to cache STFT results"
+    )
+    parser.add_argument(
+        "--stft-cache-mb",
+        type=int,
+        default=1024,
+        help="size limit of the STFT cache in MB, 0 disables the cache",
+    )
+    args = parser.parse_args()
+
+    app = AppMWF(
+        startup_report=args.startup_report,
+        stft_cache=args.stft_cache if args.stft_cache_mb > 0 else None,
+        stft_cache_bytes=args.stft_cache_mb * 2**20,
+    )
     app.MainLoop()
@@ -2,14 +2,16 @@
 
 from __future__ import annotations
 
+import warnings
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import numpy as np
-import soundfile as sf
 from numpy.random import default_rng
 
-from functions import utils
-from functions.STFT import iSTFT, mSTFT
+from functions import profiler, utils
+from functions.cache import ArrayCache, file_digest
+from functions.STFT import STFTPlan
 
 if TYPE_CHECKING:
     from numpy.typing import NDArray
@@ -42,12 +44,73 @@ class SIGNAL:
 class MWF:
     """Class: Multichannel Wiener Filter (MWF)."""
 
-    def __init__(self) -> None:
-        """Initialize."""
+    # condition number of V above which filter_init warns
+    cond_limit = 1e10
+
+    # attributes determined by the input SNR, and additionally by mu
+    filter_attrs = ("a", "ss", "V", "numrt", "denom", "x", "x_spec")
+    output_attrs = ("W", "Y", "y", "y_spec")
+
+    def __init__(
+        self,
+        dtype: str = "float64",
+        stft_cache: str | None = None,
+        stft_cache_bytes: int = 2**30,
+    ) -> None:
+        """
+        Initialize.
+
+        Parameters
+        ----------
+        dtype: str
+            precision of all stages, "float64" (complex128 spectra) or
+            "float32" (complex64 spectra)
+
+        stft_cache: str
+            if given, STFT results are cached in this directory and reused
+            when the input files and the analysis parameters are unchanged
+
+        stft_cache_bytes: int
+            size limit of the STFT cache, least recently used results are
+            removed beyond it
+
+        """
+        self.dtype = np.dtype(dtype)
+        self.cdtype = np.result_type(self.dtype, np.complex64)
         self.rg = default_rng(577)
         self.mu = 1
-
-    def load_data(self, target_path: str, interf_paths: list, snr: int = 20) -> None:
+        self.plan = None
+        self.stats = None
+        self.rtf_method = "eigh"
+        self.a = None
+
+        # chunked processing: memory-mapped caches and block size (samples)
+        self.cache_dir = None
+        self.blocksize = 2**16
+
+        # persistent cache of STFT results
+        self.stft_cache = None
+        if stft_cache is not None:
+            self.stft_cache = ArrayCache(stft_cache, stft_cache_bytes)
+        self.source_key = None
+
+        # incremented whenever X or Y changes, spectrograms are cached by them
+        self.X = None
+        self.Y = None
+        self.x_spec = None
+        self.y_spec = None
+        self.x_version = 0
+        self.y_version = 0
+        self._spec_versions = (None, None)
+
+    @profiler.timer()
+    def load_data(
+        self,
+        target_path: str,
+        interf_paths: list,
+        snr: int = 20,
+        cache_dir: str | None = None,
+    ) -> None:
         """
         Load data.
 
@@ -62,23 +125,43 @@ class MWF:
         snr: int
             input SNR (signal-plus-interferes to noise ratio)
 
+        cache_dir: str
+            if given, the signals are read block by block into memory-mapped
+            caches in this directory, and later stages also work block
+            by block, i.e., peak memory is bounded by self.blocksize
+
         """
+        # soundfile is imported on first use for a fast startup
+        import soundfile as sf
+
         self.snr = snr
+        self.cache_dir = cache_dir
+
+        # identify the input for the STFT cache: file contents and noise seed
+        if self.stft_cache is not None:
+            self.source_key = self.stft_cache.key(
+                [file_digest(p) for p in [target_path, *interf_paths]],
+                self.rg.bit_generator.state,
+            )
+
+        if cache_dir is not None:
+            self._load_data_chunked(target_path, interf_paths)
+            return
 
         # load
         raw = SIGNAL()
 
         # target signal
-        raw.s, self.fs = sf.read(target_path)
+        raw.s, self.fs = sf.read(target_path, dtype=self.dtype.name)
 
         # interferers
-        raw.i = np.zeros(raw.s.shape + (len(interf_paths),))
+        raw.i = np.zeros(raw.s.shape + (len(interf_paths),), dtype=self.dtype)
         for i, p in enumerate(interf_paths):
-            raw.i[:, :, i], _ = sf.read(p)
+            raw.i[:, :, i], _ = sf.read(p, dtype=self.dtype.name)
 
         # noise and mixture
         raw.x = raw.s + np.sum(raw.i, axis=2)
-        raw.n = self.rg.random(np.shape(raw.s))
+        raw.n = self.rg.random(np.shape(raw.s)).astype(self.dtype, copy=False)
         raw.n, _ = utils.set_snr(raw.x, raw.n, self.snr)
 
         self.raw = raw
@@ -102,6 +185,74 @@ class MWF:
         self.train = train
         self.test = test
 
+    def _load_data_chunked(self, target_path: str, interf_paths: list) -> None:
+        """Load data block by block into memory-mapped caches."""
+        import soundfile as sf
+
+        Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
+        info = sf.info(target_path)
+        self.fs = info.samplerate
+        shape = (info.frames, info.channels)
+
+        # load
+        raw = SIGNAL()
+        raw.s = self._memmap("raw_s", shape, self.dtype)
+        raw.i = self._memmap("raw_i", shape + (len(interf_paths),), self.dtype)
+        self._read_blocks(target_path, raw.s)
+        for i, p in enumerate(interf_paths):
+            self._read_blocks(p, raw.i[:, :, i])
+
+        # noise and mixture
+        raw.x = self._memmap("raw_x", shape, self.dtype)
+        raw.n = self._memmap("raw_n", shape, self.dtype)
+        for b in utils.blocks(shape[0], self.blocksize):
+            raw.x[b] = raw.s[b] + np.sum(raw.i[b], axis=-1)
+            raw.n[b] = self.rg.random(raw.n[b].shape)
+
+        raw.n *= utils.snr_gain(raw.x, raw.n, self.snr, self.blocksize)
+
+        # noisy mixture, train and test data are views of it
+        mix = self._memmap("mix", shape, self.dtype)
+        for b in utils.blocks(shape[0], self.blocksize):
+            mix[b] = raw.x[b] + raw.n[b]
+
+        self.raw = raw
+
+        # prepare train and test data
+        test = SIGNAL()
+        train = SIGNAL()
+
+        # train
+        train.s = self.raw.s[5 * self.fs + 1 :]
+        train.i = self.raw.i[5 * self.fs + 1 :]
+        train.n = self.raw.n[5 * self.fs + 1 :]
+        train.x = mix[5 * self.fs + 1 :]
+
+        # test
+        test.s = self.raw.s[0 : 5 * self.fs]
+        test.i = self.raw.i[0 : 5 * self.fs]
+        test.n = self.raw.n[0 : 5 * self.fs]
+        test.x = mix[0 : 5 * self.fs]
+
+        self.train = train
+        self.test = test
+
+    def _read_blocks(self, path: str, out: NDArray[np.float64]) -> None:
+        """Read an audio file block by block into out."""
+        import soundfile as sf
+
+        head = 0
+        for block in sf.blocks(
+            path, self.blocksize, dtype=self.dtype.name, always_2d=True
+        ):
+            out[head : head + len(block)] = block
+            head += len(block)
+
+    def _memmap(self, name: str, shape: tuple, dtype: type) -> np.memmap:
+        """Create a memory-mapped .npy file in the cache directory."""
+        path = Path(self.cache_dir) / f"{name}.npy"
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
     def set_data_snr(self) -> None:
         """Set data SNR."""
         # load
@@ -119,29 +270,177 @@ class MWF:
         self.test.n = self.raw.n[0 : 5 * self.fs]
         self.test.x = self.test.s + np.sum(self.test.i, axis=-1) + self.test.n
 
+    @profiler.timer()
+    def update_snr(self, snr: int) -> None:
+        """
+        Change the input SNR without re-running STFT.
+
+        Only the noise is rescaled to change the SNR, and the STFT is linear.
+        Thus, the noise and mixture of both time and STFT domains are updated
+        by scaling the cached noise.
+
+        Parameters
+        ----------
+        snr: int
+            input SNR (signal-plus-interferes to noise ratio)
+
+        """
+        coef = utils.snr_gain(self.raw.x, self.raw.n, snr, self.blocksize)
+        self.snr = snr
+
+        # mixtures first, while n and N still hold the old noise
+        for signal in (self.train, self.test):
+            for b in utils.blocks(signal.x.shape[0], self.blocksize):
+                signal.x[b] += (coef - 1) * signal.n[b]
+            if signal.N is not None:
+                for b in utils.blocks(signal.N.shape[2], self._frame_block()):
+                    signal.X[:, :, b] += (coef - 1) * signal.N[:, :, b]
+                    signal.N[:, :, b] *= coef
+
+        # train.n and test.n are views of raw.n
+        self.raw.n *= coef
+
+        # cached second-order statistics refer to the noise before scaling
+        if self.stats is not None:
+            self.stats["gain"] *= coef
+
+        self.x_version += 1
+
+    @profiler.timer()
     def transform(
         self,
         signal: SIGNAL,
         frlen: int = 2048,
         frsft: int | None = None,
         wnd: NDArray[np.float64] | None = None,
+        single_pass: bool = False,
+        sum_interf: bool = False,
     ) -> None:
-        """Perform STFT."""
+        """
+        Perform STFT.
+
+        Parameters
+        ----------
+        signal: SIGNAL
+            signals to be transformed
+
+        frlen: int
+            frame length
+
+        frsft: int
+            frame shift, frlen // 2 if None
+
+        wnd: array_like (frlen, )
+            analysis window, Hamming window if None
+
+        single_pass: bool
+            if True, transform the target, all interferers and the noise at once,
+            which is faster for short signals but needs a stacked copy of them
+            (ignored in the chunked mode, see load_data)
+
+        sum_interf: bool
+            if True, keep only the sum of the interferers, i.e., signal.I has
+            the shape of (n_freq, n_ch, n_frame, 1)
+
+        """
         # parameters
-        self.frlen = frlen
-        self.frsft = self.frlen // 2 if frsft is None else frsft
-        self.wnd = np.hamming(self.frlen) if wnd is None else wnd
+        frsft = frlen // 2 if frsft is None else frsft
+        wnd = np.hamming(frlen) if wnd is None else wnd
+
+        # reuse the plan unless the analysis parameters changed
+        plan = self.plan
+        if plan is None or not plan.matches(frlen, frsft, wnd, dtype=self.dtype):
+            self.plan = STFTPlan(frlen, frsft, wnd, dtype=self.dtype)
+
+        # statistics of the previous training spectra are no longer valid
+        if signal is self.train:
+            self.stats = None
 
         # STFT
-        signal.S = mSTFT(signal.s, self.frlen, self.frsft, self.wnd).transpose(2, 0, 1)
-        signal.I = np.zeros(signal.S.shape + (signal.i.shape[2],), dtype=np.complex64)
-        for i in range(signal.i.shape[2]):
-            signal.I[:, :, :, i] = mSTFT(
-                signal.i[:, :, i], self.frlen, self.frsft, self.wnd
-            ).transpose(2, 0, 1)
-        signal.N = mSTFT(signal.n, self.frlen, self.frsft, self.wnd).transpose(2, 0, 1)
+        if self.cache_dir is not None:
+            self._transform_chunked(signal, sum_interf)
+            return
+
+        # warm start: map the cached spectra
+        if self.stft_cache is not None:
+            key = self.stft_cache.key(
+                self.source_key,
+                "train" if signal is self.train else "test",
+                self.snr,
+                self.plan.frlen,
+                self.plan.frsft,
+                self.plan.wnd,
+                self.dtype.name,
+                sum_interf,
+            )
+            cached = self.stft_cache.load(key)
+            if cached is not None:
+                signal.S, signal.I, signal.N, signal.X = (cached[k] for k in "SINX")
+                return
+
+        # the STFT is linear: interferers may be summed before transformation
+        i = np.sum(signal.i, axis=-1, keepdims=True) if sum_interf else signal.i
+
+        if single_pass:
+            # stack s, i, and n into (n_src, n_ch, n_samples)
+            src = np.concatenate(
+                [signal.s[:, :, None], i, signal.n[:, :, None]], axis=-1
+            )
+            SRC = self.plan.forward(src.T, freq_first=True)
+
+            signal.S = SRC[0]
+            signal.I = np.moveaxis(SRC[1:-1], 0, -1)
+            signal.N = SRC[-1]
+        else:
+            signal.S = self.plan.forward(signal.s.T, freq_first=True)
+            signal.I = np.zeros(signal.S.shape + (i.shape[-1],), dtype=signal.S.dtype)
+            for k in range(i.shape[-1]):
+                signal.I[:, :, :, k] = self.plan.forward(i[:, :, k].T, freq_first=True)
+            signal.N = self.plan.forward(signal.n.T, freq_first=True)
         signal.X = signal.S + np.sum(signal.I, axis=-1) + signal.N
 
+        if self.stft_cache is not None:
+            arrays = dict(S=signal.S, I=signal.I, N=signal.N, X=signal.X)
+            self.stft_cache.save(key, arrays)
+
+    @profiler.timer()
+    def _transform_chunked(self, signal: SIGNAL, sum_interf: bool) -> None:
+        """Perform STFT block by block into memory-mapped caches."""
+        name = "train" if signal is self.train else "test"
+
+        # the STFT is linear: interferers may be summed before transformation
+        i = signal.i
+        if sum_interf:
+            i = self._memmap(f"{name}_i_sum", i.shape[:2] + (1,), self.dtype)
+            for b in utils.blocks(i.shape[0], self.blocksize):
+                i[b, :, 0] = np.sum(signal.i[b], axis=-1)
+
+        n_frame = self.plan.n_frame(signal.s.shape[0])
+        shape = (self.plan.n_freq, signal.s.shape[1], n_frame)
+        n_blk = self._frame_block()
+
+        signal.S = self._memmap(f"{name}_S", shape, self.cdtype)
+        signal.I = self._memmap(f"{name}_I", shape + (i.shape[-1],), self.cdtype)
+        signal.N = self._memmap(f"{name}_N", shape, self.cdtype)
+        signal.X = self._memmap(f"{name}_X", shape, self.cdtype)
+
+        self.plan.forward_to(signal.s.T, signal.S, n_blk)
+        for k in range(i.shape[-1]):
+            self.plan.forward_to(i[:, :, k].T, signal.I[:, :, :, k], n_blk)
+        self.plan.forward_to(signal.n.T, signal.N, n_blk)
+
+        for b in utils.blocks(n_frame, n_blk):
+            signal.X[:, :, b] = (
+                signal.S[:, :, b]
+                + np.sum(signal.I[:, :, b], axis=-1)
+                + signal.N[:, :, b]
+            )
+
+    def _frame_block(self) -> int:
+        """Return the number of frames processed at once in the chunked mode."""
+        return max(self.blocksize // self.plan.frsft, 1)
+
+    @profiler.timer()
     def calc_features(self) -> None:
         """
         Calculate features for filter computation.
@@ -155,26 +454,122 @@ class MWF:
         ss: array_like (n_freq, )
             Desired signal variance
 
+        Only the noise gain c changes with the SNR, thus V is assembled from
+        cached second-order statistics of the training data:
+            V = V_i + c (C_in + C_in^H) + c^2 V_n
+        where V_i and V_n are covariance matrices of the interferers and the
+        noise, and C_in is their cross-covariance matrix.
+
+        """
+        if self.stats is None:
+            self.stats = self._calc_stats()
+
+        c = self.stats["gain"]
+        self.a = self.stats["a"]
+        self.ss = self.stats["ss"]
+        self.V = self.stats["Vi"] + c * self.stats["Cin"] + c**2 * self.stats["Vn"]
+
+    @profiler.timer()
+    def _calc_stats(self) -> dict:
+        """Compute second-order statistics of the training data block by block."""
+        n_frame = self.train.S.shape[2]
+        Vs, Vi, Vn, Cin = 0, 0, 0, 0
+
+        for b in utils.blocks(n_frame, self._frame_block()):
+            S = self.train.S[:, :, b]
+            N = self.train.N[:, :, b]
+            I_sum = self.train.X[:, :, b] - S - N
+            n = S.shape[2]
+
+            Vs = Vs + utils.calc_scm(S) * n
+            Vi = Vi + utils.calc_scm(I_sum) * n
+            Vn = Vn + utils.calc_scm(N) * n
+
+            # cross-covariance of the interferers and the noise
+            Cin = Cin + I_sum @ N.conj().swapaxes(1, 2)
+
+        Vs, Vi, Vn, Cin = Vs / n_frame, Vi / n_frame, Vn / n_frame, Cin / n_frame
+
+        # warm start from the previous RTFs unless the frequency bins changed
+        a0 = self.a if self.a is not None and self.a.shape == Vs.shape[:2] else None
+
+        return dict(
+            a=utils.rtf_from_scm(Vs, self.rtf_method, a0=a0),
+            ss=Vs[:, 0, 0],
+            Vi=Vi,
+            Vn=Vn,
+            Cin=Cin + Cin.conj().swapaxes(1, 2),
+            gain=1.0,
+        )
+
+    @profiler.timer()
+    def filter_init(
+        self,
+        loading: float = 0.0,
+        check_cond: bool = False,
+        V_inv: NDArray[np.complex64] | None = None,
+    ) -> None:
         """
-        self.a = utils.calc_rtf(self.train.S)
-        self.ss = utils.calc_scm(self.train.S)[:, 0, 0]
-        self.V = utils.calc_scm(self.train.X - self.train.S)
+        Compute numerator and denominator of MWF coefficients except for mu.
+
+        V^-1 a is obtained by solving V z = a for all frequency bins at once,
+        i.e., the inverse of V is never formed.
+
+        Parameters
+        ----------
+        loading: float
+            diagonal loading relative to the average power of each bin
+
+        check_cond: bool
+            if True, compute the condition number of V for each bin (self.cond)
+            and warn if some bins exceed self.cond_limit
 
-    def filter_init(self) -> None:
-        """Compute numerator and denominator of MWF coefficients except for mu."""
+        V_inv: array_like (n_freq, n_ch, n_ch), optional
+            inverse of V tracked elsewhere, e.g., utils.RecursiveInverse.P,
+            used instead of solving (loading and check_cond are ignored)
+
+        """
         # aliases
         self.x = self._mod_amp(self.test.x)
         self.X = self.test.X
+        self.x_version += 1
 
         # preparation
         ss = self.ss[:, None, None]
         a = self.a[:, :, None]
         ah = a.conj().swapaxes(1, 2)
-        V_inv = np.linalg.inv(self.V)
-
-        self.numrt = ss * V_inv @ a
-        self.denom = ss * ah @ V_inv @ a
-
+        V = self.V
+
+        if V_inv is not None:
+            z = V_inv @ a
+            self.numrt = ss * z
+            self.denom = ss * ah @ z
+            return
+
+        if loading > 0:
+            n_ch = V.shape[1]
+            power = np.trace(V, axis1=1, axis2=2).real / n_ch
+            V = V + loading * power[:, None, None] * np.eye(n_ch, dtype=V.dtype)
+
+        if check_cond:
+            eigval = np.abs(np.linalg.eigvalsh(V))
+            self.cond = eigval.max(axis=1) / eigval.min(axis=1)
+            n_ill = np.count_nonzero(~(self.cond < self.cond_limit))
+            if n_ill > 0:
+                warnings.warn(
+                    f"V is ill-conditioned in {n_ill} of {len(self.cond)} "
+                    f"frequency bins (max. condition number: {self.cond.max():.3g}).",
+                    RuntimeWarning,
+                    stacklevel=2,
+                )
+
+        # V^-1 a
+        z = np.linalg.solve(V, a)
+
+        self.numrt = ss * z
+        self.denom = ss * ah @ z
+
+    @profiler.timer()
     def run(self, mu: int = 1) -> None:
         """
         Perform multichannel Wiener filter with given mu.
@@ -202,22 +597,276 @@ class MWF:
 
         # muda na syori
         self.Y = np.squeeze(self.Y).T
+        self.y_version += 1
+
+    @profiler.timer()
+    def run_many(self, mus: list | NDArray[np.float64]) -> NDArray[np.float64]:
+        """
+        Perform multichannel Wiener filter with many mu at once.
+
+        mu only rescales each frequency bin:
+            W^H X = numrt^H X / conj(mu + denom)
+        thus numrt^H X is computed once and the outputs are obtained by one
+        batched inverse STFT.
+
+        Parameter
+        ---------
+        mus: array_like (n_mu, )
+            tradeoff factors betweeen speech distortion and noise reduction
+
+        Returns
+        -------
+        y: array_like (n_mu, n_samples)
+            Normalized outputs, y[k] equals y after run(mus[k]) and inv_transform()
+
+        """
+        mus = np.asarray(mus, dtype=self.dtype)
 
+        # projection onto the filter direction
+        P = (self.numrt.conj().swapaxes(1, 2) @ self.X)[:, 0, :]
+
+        # per-bin gain for each mu
+        gain = 1 / np.conj(mus[:, None] + self.denom[None, :, 0, 0])
+        Y = (gain[:, :, None] * P).swapaxes(1, 2)
+
+        # inverse STFT and normalization of each output
+        y = self.plan.inverse(Y)
+        return y / np.max(np.abs(y), axis=1, keepdims=True) / 2
+
+    @profiler.timer()
     def inv_transform(self) -> None:
         """Perform inverse STFT."""
-        self.y = iSTFT(self.Y, self.frsft, self.wnd)
+        self.y = self.plan.inverse(self.Y)
         self.y = self._mod_amp(self.y)
 
-    def write(self, path: str, fn: str) -> None:
-        """Write input and output signals."""
+    @profiler.timer()
+    def write(self, path: str, fn: str, y: NDArray[np.float64] | None = None) -> None:
+        """Write input and output signals (self.y if y is None)."""
+        import soundfile as sf
+
+        y = self.y if y is None else y
         sf.write(path + "x.wav", self._mod_amp(self.x), self.fs)
-        sf.write(path + fn, self._mod_amp(self.y), self.fs)
+        sf.write(path + fn, self._mod_amp(y), self.fs)
+
+    def compute_output(self, mu: int) -> dict:
+        """
+        Compute the output for mu without changing the current state.
+
+        Returns
+        -------
+        output: dict
+            W, Y, y and y_spec as after run(mu), inv_transform() and
+            calc_spectrogram()
+
+        """
+        W = self.numrt / (mu + self.denom)
+        Y = np.squeeze(W.conj().swapaxes(1, 2) @ self.X).T
+        y = self._mod_amp(self.plan.inverse(Y))
+        return dict(W=W, Y=Y, y=y, y_spec=20 * np.log10(np.abs(Y)))
+
+    def state_key(self, mu: int | None = None) -> str:
+        """Key of the current input SNR, mu and STFT parameters."""
+        plan = self.plan
+        return ArrayCache.key(
+            self.source_key,
+            self.snr,
+            mu,
+            plan.frlen,
+            plan.frsft,
+            plan.wnd,
+            plan.zp,
+            self.dtype.name,
+        )
+
+    def get_state(self, names: tuple) -> dict:
+        """Return the attributes in names, e.g., filter_attrs or output_attrs."""
+        return {name: getattr(self, name) for name in names}
+
+    def set_state(self, state: dict) -> None:
+        """
+        Restore attributes returned by get_state or compute_output.
+
+        x_spec is assumed to belong to the current X, and the restored
+        spectrograms are marked as up to date.
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+
+        x_version, y_version = self._spec_versions
+        if "Y" in state:
+            self.y_version += 1
+        if "x_spec" in state:
+            x_version = self.x_version
+        if "y_spec" in state:
+            y_version = self.y_version
+        self._spec_versions = (x_version, y_version)
 
     def _mod_amp(self, x: NDArray[np.complex64]) -> NDArray[np.complex64]:
         """Naive normalization."""
         return x / np.max(np.abs(x)) / 2
 
-    def calc_spectrogram(self) -> None:
-        """Prepare spectrograms."""
-        self.x_spec = 20 * np.log10(np.abs(self.X[:, 0, :]))
-        self.y_spec = 20 * np.log10(np.abs(self.Y))
+    def calc_spectrogram(self) -> bool:
+        """
+        Prepare spectrograms.
+
+        Each spectrogram is recomputed only if X or Y changed since the last call,
+        and left as None until X or Y is available.
+
+        Returns
+        -------
+        updated: bool
+            True if any spectrogram was recomputed
+
+        """
+        versions = self._spec_versions
+        x_version, y_version = versions
+
+        if x_version != self.x_version and self.X is not None:
+            self.x_spec = 20 * np.log10(np.abs(self.X[:, 0, :]))
+            x_version = self.x_version
+        if y_version != self.y_version and self.Y is not None:
+            self.y_spec = 20 * np.log10(np.abs(self.Y))
+            y_version = self.y_version
+
+        self._spec_versions = (x_version, y_version)
+        return versions != self._spec_versions
+
+
+class OnlineMWF:
+    """
+    Class: online multichannel Wiener filter.
+
+    Audio is processed in hops of frsft samples. The spatial covariance
+    matrices of the mixture and the noise are tracked with an exponential
+    forgetting factor, and the RTF and the filter are updated from them.
+    The inverse of the noise covariance matrix is tracked by rank-1 updates,
+    so no matrix is inverted or solved per hop except for periodic re-anchoring.
+    The output is delayed by frlen - frsft samples (self.latency).
+    """
+
+    def __init__(
+        self,
+        n_ch: int,
+        frlen: int = 2048,
+        frsft: int | None = None,
+        wnd: NDArray[np.float64] | None = None,
+        alpha: float = 0.99,
+        mu: float = 1,
+        update_every: int = 1,
+        delta: float = 1e-6,
+        dtype: str = "float64",
+    ) -> None:
+        """
+        Initialize.
+
+        Parameters
+        ----------
+        n_ch: int
+            number of channels
+
+        frlen, frsft, wnd:
+            STFT parameters, see MWF.transform
+
+        alpha: float
+            forgetting factor of the covariance matrices
+
+        mu: float
+            tradeoff factor betweeen speech distortion and noise reduction
+
+        update_every: int
+            the RTF and the filter are updated once per this number of hops
+
+        delta: float
+            initial noise covariance matrix: delta * identity
+
+        dtype: str
+            precision of all stages, "float64" (complex128 spectra) or
+            "float32" (complex64 spectra)
+
+        """
+        self.dtype = np.dtype(dtype)
+        self.cdtype = np.result_type(self.dtype, np.complex64)
+        self.plan = STFTPlan(frlen, frsft, wnd, dtype=self.dtype)
+        self.wnd = self.plan.wnd.astype(self.dtype)
+        self.sync_wnd = self.plan.sync_wnd.astype(self.dtype)
+        self.n_ch = n_ch
+        self.alpha = alpha
+        self.mu = mu
+        self.update_every = update_every
+        self.latency = self.plan.frlen - self.plan.frsft
+
+        # covariance matrices of the mixture and the noise
+        eye = np.tile(np.eye(n_ch, dtype=self.cdtype), (self.plan.n_freq, 1, 1))
+        self.Rx = delta * eye
+        self.Vn = utils.RecursiveInverse(delta * eye, alpha)
+
+        # RTF and filter, the latter starts as the first channel
+        self.a = np.zeros((self.plan.n_freq, n_ch), dtype=self.cdtype)
+        self.a[:, 0] = 1
+        self.W = self.a.copy()
+
+        # analysis and overlap-add buffers
+        self._in = np.zeros((n_ch, self.plan.frlen), dtype=self.dtype)
+        self._out = np.zeros(self.plan.frlen, dtype=self.dtype)
+        self.n_hop = 0
+
+    def process(
+        self, hop: NDArray[np.float64], noise_only: bool = False
+    ) -> NDArray[np.float64]:
+        """
+        Process one hop.
+
+        Parameters
+        ----------
+        hop: array_like (frsft, n_ch)
+            input samples
+
+        noise_only: bool
+            True if the hop contains no target (e.g., decided by a VAD),
+            then the noise covariance matrix is updated as well
+
+        Returns
+        -------
+        y: array_like (frsft, )
+            output samples, delayed by self.latency
+
+        """
+        frsft = self.plan.frsft
+
+        # STFT of the latest frame
+        self._in[:, :-frsft] = self._in[:, frsft:]
+        self._in[:, -frsft:] = hop.T
+        X = np.fft.rfft(self._in * self.wnd, axis=-1).T.astype(self.cdtype, copy=False)
+
+        # recursive covariance tracking: R <- alpha R + (1 - alpha) x x^H
+        XXh = utils.calc_scm(X[:, :, None])
+        self.Rx = self.alpha * self.Rx + (1 - self.alpha) * XXh
+        if noise_only:
+            self.Vn.update(X)
+
+        if self.n_hop % self.update_every == 0:
+            self._update_filter()
+        self.n_hop += 1
+
+        # apply filter and overlap-add
+        Y = np.sum(self.W.conj() * X, axis=1)
+        self._out += np.fft.irfft(Y, self.plan.frlen) * self.sync_wnd
+
+        y = self._out[:frsft].copy()
+        self._out[:-frsft] = self._out[frsft:]
+        self._out[-frsft:] = 0
+
+        return y
+
+    def _update_filter(self) -> None:
+        """Update the RTF and the filter from the tracked covariance matrices."""
+        Rs = self.Rx - self.Vn.V
+
+        # one warm-started power iteration per update bounds the cost
+        self.a = utils.rtf_from_scm(Rs, "power", a0=self.a, n_iter=1)
+
+        # MWF coefficients with the tracked inverse of the noise covariance
+        ss = np.maximum(Rs[:, 0, 0].real, 0)[:, None]
+        z = (self.Vn.P @ self.a[:, :, None])[:, :, 0]
+        denom = ss * np.sum(self.a.conj() * z, axis=1, keepdims=True)
+        self.W = ss * z / (self.mu + denom)
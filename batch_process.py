@@ -1,39 +1,208 @@
 """Test script of multichannel Wiener filter."""
 
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
 from pathlib import Path
 
 import MWF
+from functions import memory, profiler
 
-if __name__ == "__main__":
-    # load
-    target_dir = Path("wav/target")
-    interf_dir = Path("wav/interf")
+mus = [0, 1, 10, 100]
+
+# environment variables limiting the number of BLAS/OpenMP threads
+blas_env = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def process(
+    target_path: str,
+    interf_paths: list,
+    out_dir: str,
+    stft_cache: str | None = None,
+    track_memory: bool = False,
+) -> tuple[float, float]:
+    """
+    Enhance one target/interferer combination.
+
+    If track_memory is True, the memory of each stage is printed at the end.
+
+    Returns
+    -------
+    duration: float
+        length of the processed recording in seconds
+    elapsed: float
+        processing time in seconds
 
-    target_path = [str(f) for f in target_dir.glob("*.wav")]
-    interf_paths = [str(f) for f in interf_dir.glob("*.wav")]
+    """
+    st = time.perf_counter()
 
-    # main
-    stream = MWF.MWF()
-    stream.load_data(target_path[0], interf_paths)
+    stream = MWF.MWF(stft_cache=stft_cache)
+    hook = memory.enable(stream) if track_memory else None
+    stream.load_data(target_path, interf_paths)
     stream.transform(stream.train)
     stream.transform(stream.test)
     stream.calc_features()
     stream.filter_init()
 
-    stream.run(mu=0)
-    stream.inv_transform()
-    stream.write("out/", "y0.wav")
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    for mu, y in zip(mus, stream.run_many(mus)):
+        stream.write(out_dir, f"y{mu}.wav", y)
+
+    if hook is not None:
+        print(hook.report())
+        memory.disable(hook)
+
+    return stream.raw.s.shape[0] / stream.fs, time.perf_counter() - st
+
+
+def interferer_sets(interf_dir: Path) -> dict:
+    """
+    Enumerate interferer sets.
+
+    Each subdirectory of interf_dir is a set. If interf_dir has no
+    subdirectories, its own wav files form a single set.
+    """
+    sets = {
+        d.name: sorted(str(f) for f in d.glob("*.wav"))
+        for d in sorted(interf_dir.iterdir())
+        if d.is_dir()
+    }
+    return sets or {interf_dir.name: sorted(str(f) for f in interf_dir.glob("*.wav"))}
+
+
+def run_corpus(
+    target_dir: Path,
+    interf_dir: Path,
+    out_dir: Path,
+    n_workers: int,
+    n_threads: int,
+    stft_cache: str | None = None,
+) -> list:
+    """
+    Process all target x interferer-set combinations on a process pool.
+
+    A failing job is reported and skipped, and the failed jobs are returned.
+    """
+    targets = sorted(target_dir.glob("*.wav"))
+    sets = interferer_sets(interf_dir)
+    jobs = [
+        (str(t), paths, f"{out_dir / t.stem / name}/", stft_cache)
+        for t, (name, paths) in product(targets, sets.items())
+    ]
+
+    # pin BLAS threads of the workers to avoid oversubscription; spawned
+    # workers import numpy after these variables are set, and the variables
+    # of this process are restored afterwards
+    saved = {key: os.environ.get(key) for key in blas_env}
+    os.environ.update({key: str(n_threads) for key in blas_env})
+
+    st = time.perf_counter()
+    duration, busy = 0.0, 0.0
+    failed = []
+    ctx = mp.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(n_workers, mp_context=ctx) as pool:
+            futures = {pool.submit(process, *job): job for job in jobs}
+            for i, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                try:
+                    d, e = future.result()
+                except Exception as err:
+                    # a broken input must not abort the whole corpus
+                    failed.append(job)
+                    print(f"[{i}/{len(jobs)}] {job[2]} FAILED: {err!r}")
+                    continue
+                duration += d
+                busy += e
+                print(f"[{i}/{len(jobs)}] {job[2]} ({e:.2f} s)")
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    wall = time.perf_counter() - st
+
+    # report
+    n_done = len(jobs) - len(failed)
+    n_files = n_done * len(mus)
+    print(
+        f"jobs: {len(jobs)} ({len(failed)} failed), workers: {n_workers}, "
+        f"BLAS threads/worker: {n_threads}"
+    )
+    print(f"wall time: {wall:.2f} s, audio: {duration:.2f} s")
+    print(f"throughput: {n_done / wall:.2f} jobs/s, {n_files / wall:.2f} files/s")
+    if duration > 0:
+        print(
+            f"real-time factor: {wall / duration:.4f} (wall), "
+            f"{busy / duration:.4f} (per job)"
+        )
+    for job in failed:
+        print(f"failed: {job[0]} with {job[1]}")
+
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--corpus",
+        action="store_true",
+        help="process every target x interferer set on a process pool",
+    )
+    parser.add_argument("--target-dir", type=Path, default=Path("wav/target"))
+    parser.add_argument("--interf-dir", type=Path, default=Path("wav/interf"))
+    parser.add_argument("--out-dir", type=Path, default=Path("out"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--threads", type=int, default=1, help="BLAS threads per worker"
+    )
+    parser.add_argument("--stft-cache", help="directory to cache STFT results")
+    parser.add_argument(
+        "--memory", action="store_true", help="print peak and retained memory per stage"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PREFIX",
+        help="time the stages and write PREFIX.json and PREFIX.folded (flame graph)",
+    )
+    args = parser.parse_args()
 
-    stream.run(mu=1)
-    stream.inv_transform()
-    stream.write("out/", "y1.wav")
+    if args.corpus:
+        failed = run_corpus(
+            args.target_dir,
+            args.interf_dir,
+            args.out_dir,
+            args.workers,
+            args.threads,
+            args.stft_cache,
+        )
+        if failed:
+            sys.exit(1)
+    else:
+        # load
+        target_path = [str(f) for f in args.target_dir.glob("*.wav")]
+        interf_paths = [str(f) for f in args.interf_dir.glob("*.wav")]
 
-    stream.run(mu=10)
-    stream.inv_transform()
-    stream.write("out/", "y10.wav")
+        # main
+        if args.profile:
+            profiler.enable()
+        out_dir = f"{args.out_dir}/"
+        process(target_path[0], interf_paths, out_dir, args.stft_cache, args.memory)
 
-    stream.run(mu=100)
-    stream.inv_transform()
-    stream.write("out/", "y100.wav")
+        if args.profile:
+            print(profiler.registry.report())
+            profiler.registry.to_json(f"{args.profile}.json")
+            profiler.registry.to_collapsed(f"{args.profile}.folded")
 
     print("done")
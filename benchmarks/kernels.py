@@ -0,0 +1,234 @@
+"""Micro-benchmarks of the DSP kernels on synthetic data."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import product
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numpy.random import default_rng
+
+import MWF
+from functions import STFT, utils
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+fs = 16000
+
+# one-at-a-time sweep around the base point, or the full grid with --grid
+base = dict(n_ch=4, frlen=2048, duration=5.0)
+sweep = dict(
+    n_ch=[2, 4, 8, 16, 32, 64],
+    frlen=[256, 512, 1024, 2048, 4096, 8192],
+    duration=[1.0, 5.0, 20.0],
+)
+
+# fields identifying a result
+case_keys = ("kernel", "n_ch", "frlen", "duration", "dtype")
+
+
+def measure(
+    func: Callable,
+    setup: Callable | None = None,
+    repeat: int = 7,
+    min_time: float = 0.1,
+) -> dict:
+    """
+    Time func like timeit, but with an untimed setup before each call.
+
+    The number of calls per repeat is raised until a repeat takes at least
+    min_time, and the time per call is reported.
+    """
+    setup = setup or (lambda: None)
+
+    def once(loops: int) -> float:
+        elapsed = 0.0
+        for _ in range(loops):
+            setup()
+            st = time.perf_counter()
+            func()
+            elapsed += time.perf_counter() - st
+        return elapsed
+
+    # warm-up and calibration
+    loops = 1
+    while (t := once(loops)) < min_time and loops < 10**6:
+        loops *= 10 if t < min_time / 10 else 2
+
+    times = [once(loops) / loops for _ in range(repeat)]
+    return dict(
+        min=min(times),
+        median=statistics.median(times),
+        mean=statistics.fmean(times),
+        loops=loops,
+        repeat=repeat,
+    )
+
+
+def kernels(n_ch: int, frlen: int, duration: float, dtype: str) -> dict:
+    """Return {name: (func, setup)} of the kernels on synthetic data."""
+    rg = default_rng(0)
+    dtype = np.dtype(dtype)
+    frsft = frlen // 2
+    wnd = np.hamming(frlen)
+
+    # synthetic multichannel signal and its STFT, both of the given precision
+    plan = STFT.STFTPlan(frlen, frsft, wnd, dtype=dtype)
+    msig = rg.standard_normal((n_ch, int(duration * fs))).astype(dtype)
+    X = plan.forward(msig, freq_first=True)
+    SIG = X.transpose(1, 2, 0)
+
+    # MWF with synthetic features of the test data
+    mwf = MWF.MWF(dtype=dtype.name)
+    mwf.plan = plan
+    mwf.test = MWF.SIGNAL()
+    mwf.test.x = msig.T
+    mwf.test.X = X
+    mwf.V = utils.calc_scm(X)
+    mwf.a = utils.rtf_from_scm(mwf.V)
+    mwf.ss = mwf.V[:, 0, 0].real
+    mwf.filter_init()
+
+    return {
+        "STFT": (lambda: STFT.STFT(msig[0], frlen, frsft, wnd), None),
+        "mSTFT": (lambda: STFT.mSTFT(msig, frlen, frsft, wnd, freq_first=True), None),
+        "iSTFT": (lambda: STFT.iSTFT(SIG, frsft, wnd), None),
+        "sync_wnd": (lambda: STFT.sync_wnd(wnd, frsft), STFT._sync_wnd.cache_clear),
+        "calc_scm": (lambda: utils.calc_scm(X), None),
+        "calc_rtf (eigh)": (lambda: utils.calc_rtf(X, "eigh"), None),
+        "calc_rtf (power)": (lambda: utils.calc_rtf(X, "power"), None),
+        "filter_init": (mwf.filter_init, None),
+        "run": (mwf.run, None),
+    }
+
+
+def cases(grid: bool) -> list[dict]:
+    """Parameter sets of the sweep."""
+    if grid:
+        return [dict(zip(sweep, p)) for p in product(*sweep.values())]
+
+    out = []
+    for name, values in sweep.items():
+        for v in values:
+            case = dict(base, **{name: v})
+            if case not in out:
+                out.append(case)
+    return out
+
+
+def run_benchmarks(
+    grid: bool = False,
+    dtype: str = "float64",
+    repeat: int = 7,
+    only: list | None = None,
+) -> dict:
+    """Run all kernels for all cases and return the results with metadata."""
+    results = []
+    for case in cases(grid):
+        for kernel, (func, setup) in kernels(**case, dtype=dtype).items():
+            if only and kernel not in only:
+                continue
+            timing = measure(func, setup, repeat)
+            results.append(dict(kernel=kernel, **case, dtype=dtype, **timing))
+            print(
+                f"{kernel:<18} ch={case['n_ch']:<3} frlen={case['frlen']:<5} "
+                f"dur={case['duration']:<5} {timing['median'] * 1e3:10.3f} ms",
+                flush=True,
+            )
+
+    return dict(meta=metadata(), results=results)
+
+
+def metadata() -> dict:
+    """Environment of a benchmark run."""
+    return dict(
+        date=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        python=sys.version.split()[0],
+        numpy=np.__version__,
+        platform=platform.platform(),
+        processor=platform.processor(),
+        cpu_count=os.cpu_count(),
+        fs=fs,
+    )
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.15) -> list[dict]:
+    """
+    Compare two benchmark results case by case.
+
+    The minimum time per call is compared, as it is the least sensitive to
+    noise. A case regresses if it is slower than the baseline by more than
+    threshold (relative), and improves if it is faster by more than that.
+    """
+    ref = {tuple(r[k] for k in case_keys): r for r in baseline["results"]}
+
+    rows = []
+    for r in current["results"]:
+        b = ref.get(tuple(r[k] for k in case_keys))
+        if b is None:
+            continue
+        ratio = r["min"] / b["min"]
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = ""
+        rows.append(dict({k: r[k] for k in case_keys}, ratio=ratio, status=status))
+
+    return rows
+
+
+def report(rows: list[dict]) -> str:
+    """Format the result of compare as a table."""
+    lines = [f"{'kernel':<18} {'ch':>3} {'frlen':>5} {'dur':>5} {'new/base':>9}"]
+    for r in rows:
+        lines.append(
+            f"{r['kernel']:<18} {r['n_ch']:>3} {r['frlen']:>5} {r['duration']:>5} "
+            f"{r['ratio']:>9.3f} {r['status']}"
+        )
+    n_reg = sum(r["status"] == "REGRESSION" for r in rows)
+    lines.append(f"{n_reg} regression(s) in {len(rows)} case(s)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default="bench_kernels.json", help="results (JSON)")
+    parser.add_argument("--grid", action="store_true", help="full grid, not a sweep")
+    parser.add_argument("--dtype", default="float64", choices=["float32", "float64"])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--kernel", nargs="+", help="run only these kernels")
+    parser.add_argument("--compare", help="baseline results (JSON) to compare against")
+    parser.add_argument("--results", help="compare saved results instead of running")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="slowdown of a regression"
+    )
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(args.grid, args.dtype, args.repeat, args.kernel)
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=1)
+        print(f"saved {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, current, args.threshold)
+        print(report(rows))
+
+        # non-zero exit status for CI
+        sys.exit(any(r["status"] == "REGRESSION" for r in rows))
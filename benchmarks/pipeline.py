@@ -0,0 +1,132 @@
+"""End-to-end throughput benchmark of the MWF pipeline on synthetic scenes."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from itertools import product
+from pathlib import Path
+
+import MWF
+from benchmarks.kernels import metadata
+from functions.scene import make_scene
+
+
+def stages(mwf: MWF.MWF, target_path: str, interf_paths: list, work_dir: Path, args):
+    """Stages of the pipeline from load_data to write, as (name, callable)."""
+    cache_dir = str(work_dir / "chunks") if args.chunked else None
+    out_dir = f"{work_dir / 'out'}/"
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    def load() -> None:
+        mwf.load_data(target_path, interf_paths, cache_dir=cache_dir)
+
+    return [
+        ("load_data", load),
+        ("transform (train)", lambda: mwf.transform(mwf.train, args.frlen)),
+        ("transform (test)", lambda: mwf.transform(mwf.test, args.frlen)),
+        ("calc_features", mwf.calc_features),
+        ("filter_init", mwf.filter_init),
+        ("run", mwf.run),
+        ("inv_transform", mwf.inv_transform),
+        ("write", lambda: mwf.write(out_dir, "y.wav")),
+    ]
+
+
+def run_scene(n_ch: int, duration: float, n_interf: int, args) -> dict:
+    """Generate a scene and time each stage with its peak and retained memory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(args.scene_dir or tmp)
+        target_path, interf_paths = make_scene(
+            str(work_dir),
+            n_ch=n_ch,
+            duration=duration,
+            n_interf=n_interf,
+            rt60=args.rt60,
+            seed=args.seed,
+        )
+
+        mwf = MWF.MWF(dtype=args.dtype)
+        rows = []
+        tracemalloc.start()
+        for name, func in stages(mwf, target_path, interf_paths, work_dir, args):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            st = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - st
+            current, peak = tracemalloc.get_traced_memory()
+
+            rows.append(
+                dict(
+                    stage=name,
+                    time=elapsed,
+                    rtf=elapsed / duration,
+                    peak=peak,
+                    retained=current - before,
+                )
+            )
+        tracemalloc.stop()
+
+    total = sum(r["time"] for r in rows)
+    return dict(
+        n_ch=n_ch,
+        duration=duration,
+        n_interf=n_interf,
+        dtype=args.dtype,
+        chunked=args.chunked,
+        time=total,
+        rtf=total / duration,
+        peak=max(r["peak"] for r in rows),
+        stages=rows,
+    )
+
+
+def report(result: dict) -> str:
+    """Format the result of one scene as a table."""
+    mb = 2**20
+    lines = [
+        f"scene: {result['n_ch']} ch, {result['duration']} s, "
+        f"{result['n_interf']} interferers ({result['dtype']}"
+        f"{', chunked' if result['chunked'] else ''})",
+        f"  {'stage':<18} {'time [s]':>9} {'RTF':>8} "
+        f"{'peak [MB]':>10} {'retained [MB]':>14}",
+    ]
+    for r in result["stages"]:
+        lines.append(
+            f"  {r['stage']:<18} {r['time']:9.3f} {r['rtf']:8.4f} "
+            f"{r['peak'] / mb:10.1f} {r['retained'] / mb:14.1f}"
+        )
+    lines.append(
+        f"  {'total':<18} {result['time']:9.3f} {result['rtf']:8.4f} "
+        f"{result['peak'] / mb:10.1f}"
+    )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, nargs="+", default=[4])
+    parser.add_argument("--duration", type=float, nargs="+", default=[10.0])
+    parser.add_argument("--interf", type=int, nargs="+", default=[2])
+    parser.add_argument("--rt60", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frlen", type=int, default=2048)
+    parser.add_argument("--dtype", default="float64", choices=["float32", "float64"])
+    parser.add_argument("--chunked", action="store_true", help="memory-mapped loading")
+    parser.add_argument("--scene-dir", help="keep the scene here, e.g., wav")
+    parser.add_argument("--out", help="results (JSON)")
+    args = parser.parse_args()
+
+    results = []
+    for n_ch, duration, n_interf in product(args.channels, args.duration, args.interf):
+        results.append(run_scene(n_ch, duration, n_interf, args))
+        print(report(results[-1]), flush=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(dict(meta=metadata(), results=results), f, indent=1)
+        print(f"saved {args.out}")
@@ -0,0 +1,78 @@
+"""Accuracy check of utils.rtf_from_scm against the per-bin eig reference."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numpy.random import default_rng
+
+from functions import utils
+
+if TYPE_CHECKING:
+    from numpy.random import Generator
+    from numpy.typing import NDArray
+
+
+def scene(n_freq: int, n_ch: int, rg: Generator) -> NDArray[np.complex128]:
+    """Covariance matrices of a rank-1 target plus spatially white noise."""
+    h = rg.standard_normal((n_freq, n_ch, 2)).view(complex)[:, :, 0]
+    power = rg.uniform(1, 10, n_freq)[:, None, None]
+    V = power * h[:, :, None] * h[:, None, :].conj()
+
+    # noise with a random (Hermitian, positive definite) coloring
+    E = rg.standard_normal((n_freq, n_ch, n_ch, 2)).view(complex)[:, :, :, 0]
+    return V + 0.1 * np.eye(n_ch) + 0.01 * E @ E.conj().swapaxes(1, 2) / n_ch
+
+
+def reference(V: NDArray[np.complex128]) -> NDArray[np.complex128]:
+    """RTFs by the general eigensolver bin by bin, i.e., the former calc_rtf."""
+    a = np.zeros(V.shape[:2], dtype=V.dtype)
+    for f in range(V.shape[0]):
+        val, vec = np.linalg.eig(V[f])
+        a[f] = vec[:, val.argsort()[-1]]
+
+    a[:, 0] += (a[:, 0] == 0) * 0.001
+    return a / a[:, 0, np.newaxis]
+
+
+def deviation(a: NDArray[np.complex128], ref: NDArray[np.complex128]) -> float:
+    """Maximum relative deviation over the frequency bins."""
+    err = np.linalg.norm(a - ref, axis=1) / np.linalg.norm(ref, axis=1)
+    return float(err.max())
+
+
+def check(n_ch: int, n_freq: int = 513, seed: int = 0) -> dict:
+    """Deviations of all methods for one number of channels."""
+    rg = default_rng(seed)
+    V = scene(n_freq, n_ch, rg)
+    ref = reference(V)
+
+    # warm start from a perturbed solution, as for a slowly changing scene
+    a0 = ref + 0.05 * rg.standard_normal(ref.shape)
+
+    return {
+        "eigh": deviation(utils.rtf_from_scm(V, "eigh"), ref),
+        "power": deviation(utils.rtf_from_scm(V, "power", n_iter=30), ref),
+        "power (warm)": deviation(utils.rtf_from_scm(V, "power", a0, n_iter=10), ref),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, nargs="+", default=[2, 4, 8, 16, 32])
+    parser.add_argument("--tol", type=float, default=1e-6, help="max. deviation")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'ch':>3} {'method':<14} {'deviation':>10}")
+    for n_ch in args.channels:
+        for method, dev in check(n_ch).items():
+            status = "" if dev < args.tol else "FAILED"
+            failed |= dev >= args.tol
+            print(f"{n_ch:>3} {method:<14} {dev:>10.2e} {status}")
+
+    # non-zero exit status for CI
+    sys.exit(failed)
@@ -1,17 +1,23 @@
 import wx
 
-from comp.parameter_panel import ParameterPanel
-from comp.plot_panel import PlotPanel
+from comp.worker import Worker
 
 
 class MainFrame(wx.Frame):
-    """Main frame inherited from wx.Panel."""
+    """
+    Main frame inherited from wx.Panel.
+
+    The frame is shown with placeholders, which are replaced by the plot and
+    parameter panels once the results of the pipeline are ready. The panels
+    (and matplotlib) are imported at that time, for a fast startup.
+    """
 
     def __init__(self, mwfo) -> None:
         # size
         self.width = 1080 + 460
         self.height = 1080
         self.fs = 16
+        self.mwfo = mwfo
 
         # size calculation
         self.r_width = self.width - self.height
@@ -28,16 +34,52 @@ class MainFrame(wx.Frame):
         # path_to_icon = "./icon/hoge.png"
         # self.SetIcon(wx.Icon(path_to_icon, wx.BITMAP_TYPE_PNG))
 
+        # background thread for computations triggered by the GUI
+        self.worker = Worker()
+
         # main panel
-        p_main = wx.Panel(self, wx.ID_ANY)
+        self.p_main = wx.Panel(self, wx.ID_ANY)
 
-        # child panels under the main panel
-        p_plot = PlotPanel(p_main, (self.height, self.height), self.fs, mwfo)
-        p_param = ParameterPanel(p_main, (self.r_width, self.height), mwfo)
+        # placeholders of child panels under the main panel
+        size_plot, size_param = (self.height, self.height), (self.r_width, self.height)
+        self.p_plot = wx.Panel(self.p_main, wx.ID_ANY, size=size_plot)
+        self.p_param = wx.Panel(self.p_main, wx.ID_ANY, size=size_param)
+        self.txt_status = wx.StaticText(self.p_plot, label="Loading...", pos=(20, 20))
 
         # layout of child panels
-        layout = wx.BoxSizer(wx.HORIZONTAL)
-        layout.Add(p_plot, proportion=1, flag=wx.EXPAND)
-        layout.Add(p_param, proportion=0, flag=wx.EXPAND)
+        self.layout = wx.BoxSizer(wx.HORIZONTAL)
+        self.layout.Add(self.p_plot, proportion=1, flag=wx.EXPAND)
+        self.layout.Add(self.p_param, proportion=0, flag=wx.EXPAND)
+
+        self.p_main.SetSizer(self.layout)
+
+    def set_status(self, text: str) -> None:
+        """Show the progress of the pipeline on the placeholder."""
+        if self.txt_status is not None:
+            self.txt_status.SetLabel(text)
+
+    def show_plot(self) -> None:
+        """Replace the placeholder by the plot panel, once X is ready."""
+        from comp.plot_panel import PlotPanel
+
+        p_plot = PlotPanel(
+            self.p_main, (self.height, self.height), self.fs, self.mwfo, self.worker
+        )
+        self._replace(self.p_plot, p_plot)
+        self.p_plot = p_plot
+        self.txt_status = None
+
+    def show_params(self) -> None:
+        """Replace the placeholder by the parameter panel, once Y is ready."""
+        from comp.parameter_panel import ParameterPanel
+
+        p_param = ParameterPanel(
+            self.p_main, (self.r_width, self.height), self.mwfo, self.worker
+        )
+        self._replace(self.p_param, p_param)
+        self.p_param = p_param
 
-        p_main.SetSizer(layout)
+    def _replace(self, old, new) -> None:
+        self.layout.Replace(old, new)
+        old.Destroy()
+        self.p_main.Layout()
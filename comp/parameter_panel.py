@@ -1,18 +1,22 @@
 import wx
 
 import comp.parameter_sizers as pp
+from functions.cache import MemoryCache
 
 
 class ParameterPanel(wx.Panel):
     """Parameter related panel inherited from wx.Panel."""
 
-    def __init__(self, parent, size, mwfo) -> None:
+    def __init__(self, parent, size, mwfo, worker) -> None:
         super().__init__(parent, wx.ID_ANY, size=size)
 
         fontsize = 12
+        # results of visited (SNR, mu) pairs, shared by the sizers
+        self.cache = MemoryCache(max_bytes=2**30)
+
         # generate panels
-        layout_data = pp.DataSizer(self, fontsize, mwfo)
-        layout_run = pp.RunSizer(self, fontsize, mwfo)
+        layout_data = pp.DataSizer(self, fontsize, mwfo, worker, self.cache)
+        layout_run = pp.RunSizer(self, fontsize, mwfo, worker, self.cache)
         layout_param = pp.ParamSizer(self, fontsize, mwfo)
 
         # set panels
@@ -1,13 +1,24 @@
-import sounddevice as sd
 import wx
 
 border = 8
 
 
+def prefetch(worker, cache, mwfo, mus) -> None:
+    """Compute the outputs for mus at the current SNR in the background."""
+
+    def stage(mu) -> None:
+        # the key is taken when the stage runs, as the SNR may have changed
+        key = mwfo.state_key(mu)
+        if key not in cache:
+            cache.put(key, mwfo.compute_output(mu))
+
+    worker.submit("prefetch", *[lambda mu=mu: stage(mu) for mu in mus], background=True)
+
+
 class RunSizer(wx.StaticBoxSizer):
     """Sizer to place execution-related buttons, etc."""
 
-    def __init__(self, parent, fontsize, mwfo) -> None:
+    def __init__(self, parent, fontsize, mwfo, worker, cache, prefetch=True) -> None:
         # prepare box
         bx = wx.StaticBox(parent, wx.ID_ANY, "Main")
         gs = wx.GridSizer(rows=2, cols=2, gap=(border, border * 2))
@@ -15,9 +26,13 @@ class RunSizer(wx.StaticBoxSizer):
         # Initialization
         super().__init__(bx, wx.VERTICAL)
         self.mwfo = mwfo
+        self.worker = worker
+        self.cache = cache
+        self.prefetch = prefetch
 
         # genrerate buttons
         bt_run = wx.Button(parent, wx.ID_ANY, "Run", style=wx.RB_GROUP)
+        self.bt_run = bt_run
         bt_ply = wx.Button(parent, wx.ID_ANY, "Play", style=wx.RB_GROUP)
 
         # set font
@@ -38,12 +53,40 @@ class RunSizer(wx.StaticBoxSizer):
         bt_ply.Bind(wx.EVT_BUTTON, self.ply)
 
     def run(self, evt) -> None:
-        """Perform MWF with current mu."""
-        self.mwfo.run(mu=self.mwfo.mu)
-        self.mwfo.inv_transform()
+        """Perform MWF with current mu on the worker thread."""
+        self.bt_run.SetLabel("Running...")
+        self.worker.submit(
+            "run",
+            lambda mu=self.mwfo.mu: self.apply(mu),
+            callback=self.done,
+        )
+
+    def apply(self, mu) -> None:
+        """Restore the output for mu from the cache, or compute and cache it."""
+        key = self.mwfo.state_key(mu)
+        state = self.cache.get(key)
+        if state is None:
+            self.mwfo.run(mu=mu)
+            self.mwfo.inv_transform()
+            self.mwfo.calc_spectrogram()
+            self.cache.put(key, self.mwfo.get_state(self.mwfo.output_attrs))
+        else:
+            self.mwfo.set_state(state)
+
+    def done(self, result) -> None:
+        """Called on the event thread when the latest run finished."""
+        self.bt_run.SetLabel("Run")
+
+        # neighbouring values of the mu slider
+        if self.prefetch:
+            mu = self.mwfo.mu
+            prefetch(self.worker, self.cache, self.mwfo, [max(mu - 1, 0), mu + 1])
 
     def ply(self, evt) -> None:
         """Play enahnced signal."""
+        # sounddevice is imported on first use for a fast startup
+        import sounddevice as sd
+
         sd.play(self.mwfo.y, self.mwfo.fs)
 
 
@@ -95,19 +138,23 @@ class ParamSizer(wx.StaticBoxSizer):
 class DataSizer(wx.StaticBoxSizer):
     """Sizer to place data-related buttons, etc."""
 
-    def __init__(self, parent, fontsize, mwfo) -> None:
+    def __init__(self, parent, fontsize, mwfo, worker, cache, prefetch=True) -> None:
         # prepare box
         bx = wx.StaticBox(parent, wx.ID_ANY, "Data loader")
 
         # Initialization
         super().__init__(bx, wx.VERTICAL)
         self.mwfo = mwfo
+        self.worker = worker
+        self.cache = cache
+        self.prefetch = prefetch
 
         # set button
         bt_ply = wx.Button(parent, wx.ID_ANY, "Play", style=wx.RB_GROUP)
 
         # generate slider
         txt_snr = wx.StaticText(parent, label="SNR")
+        self.txt_snr = txt_snr
         sl_snr = wx.Slider(
             parent,
             wx.ID_ANY,
@@ -138,16 +185,41 @@ class DataSizer(wx.StaticBoxSizer):
         bt_ply.Bind(wx.EVT_BUTTON, self.ply)
 
     def set_snr(self, evt) -> None:
-        """Get SNR value from the slider."""
-        obj = evt.GetEventObject()
-        self.mwfo.snr = obj.GetValue()
+        """Get SNR value from the slider and update the filter on the worker thread."""
+        snr = evt.GetEventObject().GetValue()
+
+        # slider bursts coalesce into the latest value
+        self.txt_snr.SetLabel("SNR (updating)")
+        self.worker.submit(
+            "snr",
+            lambda: self.mwfo.update_snr(snr),
+            self.apply,
+            callback=self.done,
+            first=True,
+        )
 
-        self.mwfo.set_data_snr()
-        self.mwfo.transform(self.mwfo.train)
-        self.mwfo.transform(self.mwfo.test)
-        self.mwfo.calc_features()
-        self.mwfo.filter_init()
+    def apply(self) -> None:
+        """Restore the filter for the current SNR from the cache, or compute it."""
+        key = self.mwfo.state_key()
+        state = self.cache.get(key)
+        if state is None:
+            self.mwfo.calc_features()
+            self.mwfo.filter_init()
+            self.mwfo.calc_spectrogram()
+            self.cache.put(key, self.mwfo.get_state(self.mwfo.filter_attrs))
+        else:
+            self.mwfo.set_state(state)
+
+    def done(self, result) -> None:
+        """Called on the event thread when the latest SNR is applied."""
+        self.txt_snr.SetLabel("SNR")
+
+        # output at the new SNR, for the next click of Run
+        if self.prefetch:
+            prefetch(self.worker, self.cache, self.mwfo, [self.mwfo.mu])
 
     def ply(self, evt) -> None:
         """Play observation."""
+        import sounddevice as sd
+
         sd.play(self.mwfo.x, self.mwfo.fs)
@@ -1,3 +1,5 @@
+import time
+
 import matplotlib as mpl
 import numpy as np
 import wx
@@ -8,16 +10,35 @@ mpl.use("WXAgg")
 
 
 class PlotPanel(wx.Panel):
-    """Panel for displaying spectrograms inherited from wx.Panel."""
+    """
+    Panel for displaying spectrograms inherited from wx.Panel.
+
+    The axes, ticks and layout are drawn once and cached as backgrounds.
+    The spectrograms are animated image artists that are updated by set_data
+    and blitted onto the background of their axes, only when they changed.
+    """
 
-    def __init__(self, parent, size, fs, mwfo) -> None:
+    def __init__(self, parent, size, fs, mwfo, worker=None) -> None:
         super().__init__(parent, wx.ID_ANY, size=size)
         self.fps = 5  # frame per second
         self.fs = fs
         self.mwfo = mwfo
+        self.worker = worker
 
-        # mpl figure
-        self.figure = mpl.figure.Figure(None)
+        # styles are read when the axes are created
+        styles = {
+            "font.size": self.fs + 1,
+            "xtick.labelsize": self.fs - 2,
+            "ytick.labelsize": self.fs - 2,
+            "figure.labelsize": self.fs + 1,
+            "axes.labelsize": self.fs + 1,
+            "axes.labelpad": 7,
+            "axes.titlesize": self.fs + 1,
+        }
+        mpl.rcParams.update(styles)
+
+        # mpl figure, the tight layout is recomputed on every full redraw
+        self.figure = mpl.figure.Figure(None, layout="tight")
         self.figure.set_facecolor((0.9, 0.9, 1.0))
         self.subplot1 = self.figure.add_subplot(211)
         self.subplot2 = self.figure.add_subplot(212)
@@ -26,12 +47,18 @@ class PlotPanel(wx.Panel):
         self.canvas = FigureCanvasWxAgg(self, -1, self.figure)
         self.canvas.SetBackgroundColour(wx.Colour(100, 255, 255))
 
+        # image artists, backgrounds of their axes and versions of drawn data
+        self.images = {}
+        self.backgrounds = {}
+        self.versions = dict(x=None, y=None)
+        self.stats = dict(refreshes=0, total_time=0.0, max_time=0.0, start=None)
+
         # set sizer
         sizer = wx.BoxSizer(wx.VERTICAL)
         sizer.Add(self.canvas, 1, wx.EXPAND)
         self.SetSizer(sizer)
         self.draw_init()
-        self.draw()
+        self.draw(self.snapshot() or [])
 
         # set timer for figures update
         self.timer = wx.Timer(self)
@@ -39,11 +66,40 @@ class PlotPanel(wx.Panel):
         self.Bind(wx.EVT_TIMER, self.update, self.timer)
 
     def update(self, evt) -> None:
-        """Routine for figures update."""
-        self.mwfo.calc_spectrogram()
-        self.draw(evt)
+        """Routine for figures update, draw skips unchanged spectrograms."""
+        specs = self.snapshot()
+
+        # the worker is modifying mwfo, retry on the next tick
+        if specs is not None:
+            self.draw(specs)
+
+    def snapshot(self) -> list | None:
+        """
+        Read the spectrograms with their versions under the worker lock.
+
+        Returns
+        -------
+        specs: list or None
+            [(key, spectrogram, version)] of "x" and "y", None if the worker
+            is busy
+
+        """
+        if self.worker is not None and not self.worker.lock.acquire(blocking=False):
+            return None
+
+        # spectrograms may also be restored from a cache by the worker
+        try:
+            self.mwfo.calc_spectrogram()
+            return [
+                ("x", self.mwfo.x_spec, self.mwfo.x_version),
+                ("y", self.mwfo.y_spec, self.mwfo.y_version),
+            ]
+        finally:
+            if self.worker is not None:
+                self.worker.lock.release()
 
     def draw_init(self) -> None:
+        """Draw the static parts of the figure and create the image artists."""
         self.di = dict(
             fbin=np.round(np.linspace(0, self.mwfo.X.shape[0], 9)).astype(int),
             fbin_txt=[str(i) for i in [0, 1, 2, 3, 4, 5, 6, 7, 8]],
@@ -51,59 +107,88 @@ class PlotPanel(wx.Panel):
             frm_txt=[str(i) for i in range(6)],
         )
 
-        styles = {
-            "font.size": self.fs + 1,
-            "xtick.labelsize": self.fs - 2,
-            "ytick.labelsize": self.fs - 2,
-            "figure.labelsize": self.fs + 1,
-            "axes.labelsize": self.fs + 1,
-            "axes.labelpad": 7,
-            "axes.titlesize": self.fs + 1,
-        }
-        mpl.pyplot.rcParams.update(styles)
-
-    def draw(self, evt=None) -> None:
-        """Routine for drawing figures."""
-
-        # observation
-        self.subplot1.cla()
-        self.subplot1.imshow(
-            self.mwfo.x_spec,
-            aspect="auto",
-            origin="lower",
-            cmap="jet",
-            vmin=-60,
-            vmax=6,
-            interpolation="antialiased",
-        )
-
-        self.subplot1.set_title("Observation")
-        self.subplot1.set_xlabel("Time [s]")
-        self.subplot1.set_ylabel("Frequency [kHz]")
-        self.subplot1.set_yticks(self.di["fbin"])
-        self.subplot1.set_yticklabels(self.di["fbin_txt"])
-        self.subplot1.set_xticks(self.di["frm"])
-        self.subplot1.set_xticklabels(self.di["frm_txt"])
-
-        # output
-        self.subplot2.cla()
-        self.subplot2.imshow(
-            self.mwfo.y_spec.T,
-            aspect="auto",
-            origin="lower",
-            cmap="jet",
-            vmin=-60,
-            vmax=6,
-            interpolation="antialiased",
+        # blank images of the final shape, filled in by draw
+        shape = (self.mwfo.X.shape[0], self.mwfo.X.shape[2])
+        for key, ax, title in [
+            ("x", self.subplot1, "Observation"),
+            ("y", self.subplot2, "Enhanced signal"),
+        ]:
+            self.images[key] = ax.imshow(
+                np.full(shape, np.nan),
+                aspect="auto",
+                origin="lower",
+                cmap="jet",
+                vmin=-60,
+                vmax=6,
+                interpolation="antialiased",
+                animated=True,
+            )
+            ax.set_title(title)
+            ax.set_xlabel("Time [s]")
+            ax.set_ylabel("Frequency [kHz]")
+            ax.set_yticks(self.di["fbin"])
+            ax.set_yticklabels(self.di["fbin_txt"])
+            ax.set_xticks(self.di["frm"])
+            ax.set_xticklabels(self.di["frm_txt"])
+
+        # the background is cached on every full redraw of the canvas, e.g.,
+        # after resizing, which also updates the layout
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, evt) -> None:
+        """Cache the backgrounds after a full redraw and put the images back."""
+        for key, img in self.images.items():
+            self.backgrounds[key] = self.canvas.copy_from_bbox(img.axes.bbox)
+            img.axes.draw_artist(img)
+
+    def draw(self, specs: list) -> None:
+        """
+        Routine for drawing figures: blit the images that changed, if any.
+
+        specs is a snapshot of the spectrograms returned by snapshot().
+        """
+        st = time.perf_counter()
+
+        # update image data, spectrograms not ready yet stay blank
+        changed = []
+        for key, spec, version in specs:
+            if spec is not None and self.versions[key] != version:
+                self.images[key].set_data(spec if key == "x" else spec.T)
+                self.versions[key] = version
+                changed.append(key)
+
+        if not self.backgrounds:
+            # first draw, on_draw caches the backgrounds
+            self.canvas.draw()
+        elif changed:
+            for key in changed:
+                img = self.images[key]
+                self.canvas.restore_region(self.backgrounds[key])
+                img.axes.draw_artist(img)
+                self.canvas.blit(img.axes.bbox)
+        else:
+            return
+
+        # timing
+        elapsed = time.perf_counter() - st
+        stats = self.stats
+        stats["start"] = stats["start"] or st
+        stats["refreshes"] += 1
+        stats["total_time"] += elapsed
+        stats["max_time"] = max(stats["max_time"], elapsed)
+
+    def report(self) -> str:
+        """Summarize refresh time and achieved frame rate."""
+        stats = self.stats
+        n = max(stats["refreshes"], 1)
+        wall = time.perf_counter() - stats["start"] if stats["start"] else 0.0
+        fps = stats["refreshes"] / wall if wall > 0 else 0.0
+        return "\n".join(
+            [
+                f"refreshes: {stats['refreshes']} in {wall:.1f} s ({fps:.2f} fps)",
+                f"refresh time: {stats['total_time'] / n * 1e3:.3f} ms (mean), "
+                f"{stats['max_time'] * 1e3:.3f} ms (max), "
+                f"budget {1e3 / self.fps:.1f} ms",
+                f"max. sustainable rate: {n / max(stats['total_time'], 1e-9):.1f} fps",
+            ]
         )
-        self.subplot2.set_title("Enhanced signal")
-        self.subplot2.set_xlabel("Time [s]")
-        self.subplot2.set_ylabel("Frequency [kHz]")
-        self.subplot2.set_yticks(self.di["fbin"])
-        self.subplot2.set_yticklabels(self.di["fbin_txt"])
-        self.subplot2.set_xticks(self.di["frm"])
-        self.subplot2.set_xticklabels(self.di["frm_txt"])
-
-        self.figure.tight_layout()
-
-        self.canvas.draw()
@@ -0,0 +1,88 @@
+import threading
+import traceback
+
+import wx
+
+
+class Worker:
+    """
+    Background thread running GUI jobs off the event thread.
+
+    A job is a sequence of stages (callables) submitted under a key. Only the
+    latest job per key is kept, i.e., a burst of slider events coalesces into
+    its last value, and a running job is abandoned between stages as soon as
+    a newer job with the same key is submitted. The return value of the last
+    stage is posted to the callback on the event thread by wx.CallAfter, or
+    None if a stage raised an exception.
+
+    All jobs run on the same thread in submission order. A job replacing a
+    pending job keeps its place in the queue, otherwise it is queued at the
+    end. Jobs submitted with first=True (e.g., SNR changes, on which the
+    other jobs depend) are queued ahead of all waiting jobs, so that a run
+    never uses the state of an SNR older than the latest one submitted.
+    self.lock is held while a job runs, so that the event thread can skip
+    reading shared state.
+    Background jobs (e.g., prefetching) are also abandoned between stages
+    whenever any other job is waiting.
+
+    Usage
+    ----------
+    worker = Worker()
+    worker.submit("snr", lambda: mwfo.update_snr(snr), mwfo.calc_features, first=True)
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._pending = {}  # key -> (generation, stages, callback, background)
+        self._generation = {}
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self, key: str, *stages, callback=None, background=False, first=False
+    ) -> None:
+        """Schedule stages under key, superseding any job with the same key."""
+        with self._cond:
+            generation = self._generation.get(key, 0) + 1
+            self._generation[key] = generation
+
+            # replace a pending job in place, or queue it at the end
+            job = (generation, stages, callback, background)
+            if first:
+                self._pending.pop(key, None)
+                self._pending = {key: job, **self._pending}
+            else:
+                self._pending[key] = job
+            self._cond.notify()
+
+    def superseded(self, key: str, generation: int) -> bool:
+        """Return True if a newer job with the same key was submitted."""
+        with self._cond:
+            return self._generation[key] != generation
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key = next(iter(self._pending))
+                generation, stages, callback, background = self._pending.pop(key)
+
+            with self.lock:
+                result = None
+                try:
+                    for stage in stages:
+                        interrupted = background and bool(self._pending)
+                        if interrupted or self.superseded(key, generation):
+                            break
+                        result = stage()
+                    else:
+                        if callback is not None:
+                            wx.CallAfter(callback, result)
+                except Exception:
+                    # keep the worker alive for the following jobs, and let the
+                    # callback reset the GUI
+                    traceback.print_exc()
+                    if callback is not None:
+                        wx.CallAfter(callback, None)
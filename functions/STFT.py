@@ -1,63 +1,75 @@
 # -*- coding: utf-8 -*-
 "STFT: Package for short-time Fourier Transform"
+import functools
+
 import numpy as np
-import matplotlib.pyplot as plt
 
+from functions import profiler
 
-def STFT(sig, frlen, frsft, wnd, zp=True):
+# size of the windowed frames transformed at once for the 'freq_first' layout
+block_bytes = 2**23
+
+
+def frame(sig, frlen, frsft, zp=True):
     """
-    short-time Fourier Transform
+    split a signal into overlapping frames without copying them
 
     parameters
     ----------
-    sig: array_like (n_samples)
-        Time domain signal to be analyzed
+    sig: array_like (..., n_samples)
+        Time domain signal(s), the last axis is time
     frlen: int
         Frame length of STFT analysis (samples)
     frsft: int
         Frame shift length of STFT analysis (samples)
-    wnd: array_like (n_samples)
-        Window function, the length must be equal to 'frlen'
     zp: bool, optional
         If True, do zero padding at the head of 'sig'
 
     return
     ----------
-    SIG: array_like (# of frames, # of freq. bin)
-        STFT domain signal
+    frames: array_like (..., # of frames, frlen)
+        Read-only strided view of the zero-padded signal(s)
     """
 
+    l_zp, n_frame, n_pad = _geometry(sig.shape[-1], frlen, frsft, zp)
+
     # zero padding
-    l_zp = frlen - frsft if zp is True else 0
-    zero_pad = np.zeros(l_zp)
-    sig = np.concatenate([zero_pad, sig, zero_pad])
-    n_samples = sig.shape[0]
+    padded = np.zeros(sig.shape[:-1] + (n_pad,))
+    padded[..., l_zp : l_zp + sig.shape[-1]] = sig
 
-    # deal with an abnormal case
-    if frlen > n_samples:
-        sig = np.append(sig, np.zeros([frlen - n_samples]))
-        n_samples = frlen
+    # strided view: frame t starts at sample t * frsft
+    frames = np.lib.stride_tricks.sliding_window_view(padded, frlen, axis=-1)
+    return frames[..., : (n_frame - 1) * frsft + 1 : frsft, :]
 
-    # set the number of time frames and frequency bins
-    n_frame = int(np.ceil((n_samples - frsft) / frsft))
-    n_freq = frlen // 2 + 1
 
-    # zero padding for the tail of the signal
-    tmp = np.zeros([(n_frame - 1) * frsft + frlen - n_samples])
-    sig = np.concatenate([sig, tmp])
+def STFT(sig, frlen, frsft, wnd, zp=True):
+    """
+    short-time Fourier Transform
 
-    # initialization
-    SIG = np.zeros([n_frame, n_freq], dtype=complex)
+    parameters
+    ----------
+    sig: array_like (n_samples) or (..., n_samples)
+        Time domain signal to be analyzed, leading axes are transformed at once
+    frlen: int
+        Frame length of STFT analysis (samples)
+    frsft: int
+        Frame shift length of STFT analysis (samples)
+    wnd: array_like (n_samples)
+        Window function, the length must be equal to 'frlen'
+    zp: bool, optional
+        If True, do zero padding at the head of 'sig'
 
-    # main
-    for t in range(n_frame):
-        head = t * frsft
-        SIG[t, :] = np.fft.rfft(sig[head : head + frlen] * wnd)
+    return
+    ----------
+    SIG: array_like (# of frames, # of freq. bin) or (..., # of frames, # of freq. bin)
+        STFT domain signal
+    """
 
-    return SIG
+    # all frames (and channels) in one batched FFT
+    return np.fft.rfft(frame(sig, frlen, frsft, zp) * wnd, axis=-1)
 
 
-def mSTFT(msig, frlen, frsft, wnd, zp=True):
+def mSTFT(msig, frlen, frsft, wnd, zp=True, freq_first=False):
     """
     short-time Fourier Transform
 
@@ -73,16 +85,19 @@ def mSTFT(msig, frlen, frsft, wnd, zp=True):
         Window function, the length must be equal to 'frlen'
     zp: bool, optional
         If True, do zero padding at the head of 'msig'
+    freq_first: bool, optional
+        If True, return a C-contiguous array of (# of freq. bin, # of ch., # of frames),
+        written block by block without transposing a full copy
 
     return
     ----------
     mSIG: array_like (# of ch., # of frames, # of freq. bin)
         STFT domain signal
+        (# of freq. bin, # of ch., # of frames) if 'freq_first' is True
     """
 
     # set parameters
     if msig.ndim == 1:
-        n_samples = msig.shape[0]
         n_ch = 1
         msig = msig[np.newaxis, :]
     else:
@@ -91,25 +106,55 @@ def mSTFT(msig, frlen, frsft, wnd, zp=True):
             msig = msig.T
             n_ch, n_samples = msig.shape
 
-    l_zp = frlen - frsft if zp is True else 0
+    # main
+    if freq_first:
+        # spectra of a block of frames are written directly into the layout
+        frames = frame(msig, frlen, frsft, zp)
+        n_frame = frames.shape[-2]
+        n_blk = _block_frames(n_ch, frlen)
+        mSIG = np.empty((frlen // 2 + 1, n_ch, n_frame), dtype=complex)
+        for t0 in range(0, n_frame, n_blk):
+            b = slice(t0, t0 + n_blk)
+            SIG = np.fft.rfft(frames[:, b, :] * wnd, axis=-1)
+            mSIG[:, :, b] = SIG.transpose(2, 0, 1)
+        return mSIG if n_ch != 1 else np.squeeze(mSIG, axis=1)
+
+    mSIG = STFT(msig, frlen, frsft, wnd, zp)
+    return mSIG if n_ch != 1 else np.squeeze(mSIG, axis=0)
 
-    # deal with an abnormal case
-    if frlen > n_samples:
-        msig = np.append(msig, np.zeros([n_ch, frlen - n_samples]), axis=0)
-        n_samples = frlen
 
-    # set the number of time frames and frequency bins
-    n_frame = int(np.ceil((n_samples + 2 * l_zp - frsft) / frsft))
-    n_freq = frlen // 2 + 1
+def overlap_add(frames, frsft):
+    """
+    overlap-add of time domain frames
 
-    # initialization
-    mSIG = np.zeros([n_ch, n_frame, n_freq], dtype=complex)
+    parameters
+    ----------
+    frames: array_like (..., # of frames, frlen)
+        Time domain frames, leading axes are processed at once
+    frsft: int
+        Frame shift length (samples)
 
-    # main
-    for ch in range(n_ch):
-        mSIG[ch, :, :] = STFT(msig[ch, :], frlen, frsft, wnd, zp)
+    return
+    ----------
+    sig: array_like (..., (# of frames - 1) * frsft + frlen)
+        Time domain signal(s)
+    """
 
-    return mSIG if n_ch != 1 else np.squeeze(mSIG, axis=0)
+    # split each frame into blocks of frsft samples
+    *lead, n_frame, frlen = frames.shape
+    n_blk = -(-frlen // frsft)
+    if frlen != n_blk * frsft:
+        pad = np.zeros(frames.shape[:-1] + (n_blk * frsft - frlen,), dtype=frames.dtype)
+        frames = np.concatenate([frames, pad], axis=-1)
+    blocks = frames.reshape(lead + [n_frame, n_blk, frsft])
+
+    # block b of frame t lands on block t + b of the output
+    sig = np.zeros(lead + [(n_frame + n_blk - 1) * frsft], dtype=frames.dtype)
+    sig_blocks = sig.reshape(lead + [n_frame + n_blk - 1, frsft])
+    for b in range(n_blk):
+        sig_blocks[..., b : b + n_frame, :] += blocks[..., :, b, :]
+
+    return sig[..., : (n_frame - 1) * frsft + frlen]
 
 
 def iSTFT(SIG, frsft, wnd, zp=True):
@@ -118,8 +163,8 @@ def iSTFT(SIG, frsft, wnd, zp=True):
 
     parameters
     ----------
-    SIG: array_like (# of frames, # of freq. bin)
-        STFT domain signal
+    SIG: array_like (# of frames, # of freq. bin) or (..., # of frames, # of freq. bin)
+        STFT domain signal, leading axes are transformed at once
     frsft: int
         Frame shift length used for STFT analysis (samples)
     wnd: array_like (n_samples)
@@ -129,25 +174,20 @@ def iSTFT(SIG, frsft, wnd, zp=True):
 
     return
     ----------
-    sig: array_like (n_samples)
+    sig: array_like (n_samples) or (..., n_samples)
         Time domain signal
     """
 
     # set default values
-    n_frame, n_freq = SIG.shape
-    frlen = (n_freq - 1) * 2
+    frlen = (SIG.shape[-1] - 1) * 2
     l_zp = frlen - frsft if zp is True else 0
 
-    # initialization
-    sig = np.zeros([(n_frame - 1) * frsft + frlen])
-    wnd = sync_wnd(wnd, frsft)
-
-    # main
-    for t in range(n_frame):
-        head = t * frsft
-        sig[head : head + frlen] += np.fft.irfft(SIG[t, :], frlen) * wnd
+    # all frames (and channels) in one batched inverse FFT
+    frames = np.fft.irfft(SIG, frlen, axis=-1)
+    frames *= sync_wnd(wnd, frsft)
+    sig = overlap_add(frames, frsft)
 
-    return sig[l_zp:-l_zp] if zp else sig
+    return sig[..., l_zp:-l_zp] if zp else sig
 
 
 def miSTFT(mSIG, frsft, wnd, zp=True):
@@ -171,39 +211,257 @@ def miSTFT(mSIG, frsft, wnd, zp=True):
         Time domain multichannel signal
     """
 
-    # set default values
-    if mSIG.ndim == 2:
-        n_frame, n_freq = mSIG.shape
-        n_ch = 1
-        mSIG = mSIG[np.newaxis, :, :]
-    else:
-        n_ch, n_frame, n_freq = mSIG.shape
-    frlen = (n_freq - 1) * 2
-    l_zp = frlen - frsft if zp is True else 0
+    # main
+    return np.squeeze(iSTFT(mSIG, frsft, wnd, zp))
 
-    # initialization
-    msig = np.zeros([n_ch, (n_frame - 1) * frsft + frlen - 2 * l_zp])
 
-    # main
-    for k in range(n_ch):
-        msig[k, :] = iSTFT(mSIG[k, :, :], frsft, wnd, zp)
+def sync_wnd(wnd, frsft):
+    """
+    synthesis window for perfect reconstruction, memoized by (wnd, frsft)
+
+    parameters
+    ----------
+    wnd: array_like (frlen)
+        Analysis window
+    frsft: int
+        Frame shift length (samples)
 
-    return np.squeeze(msig)
+    return
+    ----------
+    sync_wnd: array_like (frlen)
+        Synthesis window (read-only)
+    """
+    wnd = np.asarray(wnd, dtype=float)
+    return _sync_wnd(wnd.tobytes(), frsft)
 
 
-def sync_wnd(wnd, frsft):
+@functools.lru_cache(maxsize=16)
+def _sync_wnd(wnd_bytes, frsft):
+    wnd = np.frombuffer(wnd_bytes)
     frlen = wnd.shape[0]
-    sync_wnd = np.zeros(frlen)
 
-    for i in range(frsft):
-        amp = 0
-        for j in range(frlen // frsft):
-            amp = amp + wnd[i + (j - 1) * frsft] * wnd[i + (j - 1) * frsft]
-        for j in range(frlen // frsft):
-            sync_wnd[i + (j - 1) * frsft] = wnd[i + (j - 1) * frsft] / amp
+    # samples sharing the same position within a shift, head one wraps around
+    idx = np.arange(frsft)[:, np.newaxis] + (np.arange(frlen // frsft) - 1) * frsft
+    idx %= frlen
+    amp = np.sum(wnd[idx] * wnd[idx], axis=1, keepdims=True)
+
+    sync_wnd = np.zeros(frlen)
+    sync_wnd[idx] = wnd[idx] / amp
+    sync_wnd.setflags(write=False)
 
     return sync_wnd
 
 
+class STFTPlan:
+    """
+    precomputed short-time Fourier Transform, similar to an FFTW plan
+
+    The window, synthesis window and frame geometry are prepared once and
+    reused by every forward/inverse call. Scratch buffers are kept only for
+    small inputs (up to 'scratch_bytes' in total), e.g., repeated blocks of a
+    stream; larger inputs use temporary buffers freed after each call. The
+    scratch buffers are shared, so a plan must not be used by several threads
+    at once.
+
+    parameters
+    ----------
+    frlen: int
+        Frame length of STFT analysis (samples)
+    frsft: int, optional
+        Frame shift length of STFT analysis (samples), frlen // 2 by default
+    wnd: array_like (frlen), optional
+        Window function, Hamming window by default
+    zp: bool, optional
+        If True, do zero padding at the head and tail of signals
+    dtype: data-type, optional
+        Precision of time domain signals (float32 or float64), spectra are
+        of the corresponding complex type (complex64 or complex128)
+
+    usage
+    ----------
+    plan = STFTPlan(2048)
+    mSIG = plan.forward(msig, freq_first=True)
+    sig = plan.inverse(SIG)
+    """
+
+    scratch_bytes = 2**20
+
+    def __init__(self, frlen, frsft=None, wnd=None, zp=True, dtype=np.float64):
+        self.frlen = frlen
+        self.frsft = frlen // 2 if frsft is None else frsft
+        self.wnd = np.hamming(frlen) if wnd is None else np.asarray(wnd, dtype=float)
+        self.zp = zp
+        self.dtype = np.dtype(dtype)
+        self.cdtype = np.result_type(self.dtype, np.complex64)
+
+        self.l_zp = self.frlen - self.frsft if zp is True else 0
+        self.n_freq = self.frlen // 2 + 1
+        self.sync_wnd = sync_wnd(self.wnd, self.frsft)
+
+        # scratch buffers keyed by input shape: (padded signal, windowed frames)
+        self._scratch = {}
+
+    def matches(self, frlen, frsft, wnd, zp=True, dtype=np.float64):
+        """Return True if the plan was built with the given parameters."""
+        return (
+            self.frlen == frlen
+            and self.frsft == frsft
+            and self.zp == zp
+            and self.dtype == dtype
+            and np.array_equal(self.wnd, wnd)
+        )
+
+    def n_frame(self, n_samples):
+        """Return the number of frames for a signal of 'n_samples' samples."""
+        return _geometry(n_samples, self.frlen, self.frsft, self.zp)[1]
+
+    @profiler.timer()
+    def forward(self, sig, freq_first=False):
+        """
+        short-time Fourier Transform
+
+        parameters
+        ----------
+        sig: array_like (n_samples) or (..., n_samples)
+            Time domain signal(s), leading axes (e.g., channels) are transformed at once
+        freq_first: bool, optional
+            If True, return a C-contiguous array with frequency moved in front of
+            the last two axes, i.e., (# of freq. bin, # of ch., # of frames),
+            which is written block by block without transposing a full copy
+
+        return
+        ----------
+        SIG: array_like (..., # of frames, # of freq. bin)
+            STFT domain signal
+        """
+        if freq_first:
+            lead = sig.shape[:-1]
+            n_frame = self.n_frame(sig.shape[-1])
+            shape = lead[:-1] + (self.n_freq,) + lead[-1:] + (n_frame,)
+            out = np.empty(shape, dtype=self.cdtype)
+            n_blk = _block_frames(int(np.prod(lead)), self.frlen)
+            return self._forward_blocks(sig, out, n_blk)
+
+        padded, windowed = self._buffers(sig.shape)
+        padded[..., self.l_zp : self.l_zp + sig.shape[-1]] = sig
+
+        # windowed frames into the scratch buffer, then one batched FFT
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.frlen, axis=-1)
+        frames = frames[..., : windowed.shape[-2] * self.frsft : self.frsft, :]
+        np.multiply(frames, self.wnd, out=windowed)
+        return np.fft.rfft(windowed, axis=-1).astype(self.cdtype, copy=False)
+
+    @profiler.timer()
+    def forward_to(self, sig, out, n_blk=256):
+        """
+        short-time Fourier Transform, block by block
+
+        Only 'n_blk' frames are in memory at once, so 'sig' and 'out' may be
+        memory-mapped arrays much larger than the memory.
+
+        parameters
+        ----------
+        sig: array_like (n_samples) or (..., n_samples)
+            Time domain signal(s), leading axes (e.g., channels) are transformed at once
+        out: array_like
+            Output array of the 'freq_first' layout of forward(),
+            e.g., (# of freq. bin, # of ch., # of frames)
+        n_blk: int, optional
+            Number of frames per block
+
+        return
+        ----------
+        out: array_like
+            STFT domain signal
+        """
+        return self._forward_blocks(sig, out, n_blk)
+
+    def _forward_blocks(self, sig, out, n_blk):
+        """STFT of blocks of 'n_blk' frames into 'out', see forward_to()."""
+        n_samples = sig.shape[-1]
+        n_frame = self.n_frame(n_samples)
+
+        for t0 in range(0, n_frame, n_blk):
+            t1 = min(t0 + n_blk, n_frame)
+
+            # segment [p0, p1) of the zero-padded signal covered by the frames
+            p0 = t0 * self.frsft
+            p1 = (t1 - 1) * self.frsft + self.frlen
+            s0 = min(max(p0 - self.l_zp, 0), n_samples)
+            s1 = min(max(p1 - self.l_zp, 0), n_samples)
+
+            seg = np.zeros(sig.shape[:-1] + (p1 - p0,), dtype=self.dtype)
+            seg[..., s0 + self.l_zp - p0 : s1 + self.l_zp - p0] = sig[..., s0:s1]
+
+            frames = np.lib.stride_tricks.sliding_window_view(seg, self.frlen, axis=-1)
+            SIG = np.fft.rfft(frames[..., :: self.frsft, :] * self.wnd, axis=-1)
+            out[..., t0:t1] = np.moveaxis(SIG, -1, max(-3, -SIG.ndim))
+
+        return out
+
+    @profiler.timer()
+    def inverse(self, SIG):
+        """
+        inverse short-time Fourier Transform
+
+        parameters
+        ----------
+        SIG: array_like (..., # of frames, # of freq. bin)
+            STFT domain signal, leading axes (e.g., channels) are transformed at once
+
+        return
+        ----------
+        sig: array_like (n_samples) or (..., n_samples)
+            Time domain signal
+        """
+        frames = np.fft.irfft(SIG, self.frlen, axis=-1).astype(self.dtype, copy=False)
+        frames *= self.sync_wnd
+        sig = overlap_add(frames, self.frsft)
+
+        return sig[..., self.l_zp : -self.l_zp] if self.zp else sig
+
+    def _buffers(self, shape):
+        """Return scratch buffers for an input of the given shape."""
+        if shape in self._scratch:
+            return self._scratch[shape]
+
+        _, n_frame, n_pad = _geometry(shape[-1], self.frlen, self.frsft, self.zp)
+        buffers = (
+            np.zeros(shape[:-1] + (n_pad,), dtype=self.dtype),
+            np.empty(shape[:-1] + (n_frame, self.frlen), dtype=self.dtype),
+        )
+
+        # keep them only if they fit, evicting the oldest ones
+        nbytes = sum(b.nbytes for b in buffers)
+        if nbytes <= self.scratch_bytes:
+            while nbytes + self._scratch_nbytes() > self.scratch_bytes:
+                self._scratch.pop(next(iter(self._scratch)))
+            self._scratch[shape] = buffers
+
+        return buffers
+
+    def _scratch_nbytes(self):
+        return sum(b.nbytes for buffers in self._scratch.values() for b in buffers)
+
+
+def _block_frames(n_lead, frlen):
+    """Return the number of frames per block of about 'block_bytes'."""
+    return max(block_bytes // (8 * n_lead * frlen), 1)
+
+
+def _geometry(n_samples, frlen, frsft, zp):
+    """Return head zero padding, number of frames and padded length."""
+
+    # number of samples after zero padding (the signal is at least one frame)
+    l_zp = frlen - frsft if zp is True else 0
+    n_samples = max(n_samples + 2 * l_zp, frlen)
+
+    # set the number of time frames and zero padding for the tail
+    n_frame = int(np.ceil((n_samples - frsft) / frsft))
+    n_pad = max((n_frame - 1) * frsft + frlen, n_samples)
+
+    return l_zp, n_frame, n_pad
+
+
 def truncate(sig, ref):
     return sig[: ref.shape[0]] if sig.ndim == 1 else sig[:, : ref.shape[0]]
@@ -0,0 +1,165 @@
+"""cache: caches of arrays in memory and on disk."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+def file_digest(path: str, blocksize: int = 2**20) -> str:
+    """Return the SHA-256 digest of the file content."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(blocksize):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ArrayCache:
+    """
+    Size-bounded LRU cache of NumPy arrays on disk.
+
+    Each entry is a directory of .npy files, which are memory-mapped on load.
+    The modification time of an entry records its last use, and the least
+    recently used entries are evicted when the total size exceeds max_bytes.
+
+    Usage
+    ----------
+    cache = ArrayCache(".cache/stft")
+    key = cache.key("train", 2048, wnd)
+    arrays = cache.load(key)
+    if arrays is None:
+        cache.save(key, dict(S=S, N=N))
+    """
+
+    def __init__(self, root: str, max_bytes: int = 2**32) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Hash arrays (by content) and other objects (by repr) into a key."""
+        h = hashlib.sha256()
+        for p in parts:
+            if isinstance(p, np.ndarray):
+                h.update(str((p.dtype, p.shape)).encode())
+                h.update(np.ascontiguousarray(p).tobytes())
+            else:
+                h.update(repr(p).encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def load(self, key: str) -> dict | None:
+        """
+        Return the arrays of an entry, None if missing.
+
+        The arrays are copy-on-write memory maps, i.e., in-place modifications
+        stay in memory and never reach the cache.
+        """
+        entry = self.root / key
+        if not entry.is_dir():
+            return None
+
+        os.utime(entry)
+        return {f.stem: np.load(f, mmap_mode="c") for f in entry.glob("*.npy")}
+
+    def save(self, key: str, arrays: dict) -> None:
+        """Store arrays as an entry, then evict least recently used entries."""
+        entry = self.root / key
+        if entry.is_dir():
+            return
+
+        # write to a temporary directory first so that no partial entry is seen
+        tmp = self.root / f".{key}.{os.getpid()}.tmp"
+        tmp.mkdir(parents=True, exist_ok=True)
+        for name, arr in arrays.items():
+            np.save(tmp / f"{name}.npy", arr)
+        try:
+            tmp.rename(entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        self.evict(keep=key)
+
+    def evict(self, keep: str | None = None) -> None:
+        """Remove least recently used entries until the size limit is met."""
+        entries = []
+        for entry in self.root.iterdir():
+            if entry.is_dir() and not entry.name.startswith("."):
+                size = sum(f.stat().st_size for f in entry.glob("*.npy"))
+                entries.append((entry.stat().st_mtime, size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for entry in self.root.iterdir():
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+class MemoryCache:
+    """
+    LRU cache of arrays in memory, bounded by their total size in bytes.
+
+    Each entry is a dict of arrays (other values count as zero bytes). The
+    entries are neither copied on put nor on get, so they must not be
+    modified in place afterwards.
+
+    Usage
+    ----------
+    cache = MemoryCache(2**30)
+    state = cache.get(key)
+    if state is None:
+        cache.put(key, dict(Y=Y, y=y))
+    """
+
+    def __init__(self, max_bytes: int = 2**30) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # key -> (nbytes, arrays)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> dict | None:
+        """Return the arrays of an entry and mark it as recently used."""
+        if key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        return self._entries[key][1]
+
+    def put(self, key: str, arrays: dict) -> None:
+        """Store arrays, then evict least recently used entries."""
+        nbytes = sum(v.nbytes for v in arrays.values() if isinstance(v, np.ndarray))
+        if nbytes > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[0]
+        self._entries[key] = (nbytes, arrays)
+        self.nbytes += nbytes
+
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self._entries.popitem(last=False)[1][0]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self.nbytes = 0
@@ -0,0 +1,194 @@
+"""memory: per-stage memory accounting as a profiler hook."""
+
+from __future__ import annotations
+
+import mmap
+import tracemalloc
+
+import numpy as np
+
+from functions import profiler
+
+
+def array_bytes(obj, prefix: str = "", depth: int = 4) -> dict:
+    """
+    Bytes of the NumPy arrays held by obj, e.g., MWF and its SIGNAL attributes.
+
+    Attributes, dicts, lists and tuples are searched up to the given depth.
+    Each buffer is counted once, under the names of all arrays referring to
+    it, e.g., "raw.s, train.s, test.s" as train.s and test.s are views.
+
+    Returns
+    -------
+    nbytes: dict
+        {names: (bytes, mapped)}, mapped is True for memory-mapped buffers
+
+    """
+    buffers = {}
+    _collect(obj, prefix, depth, buffers, set())
+    return {
+        ", ".join(names): (root.nbytes, isinstance(root.base, mmap.mmap))
+        for root, names in buffers.values()
+    }
+
+
+def _collect(obj, prefix: str, depth: int, buffers: dict, visited: set) -> None:
+    if isinstance(obj, np.ndarray):
+        root = obj
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        buffers.setdefault(id(root), (root, []))[1].append(prefix)
+        return
+
+    if depth == 0 or id(obj) in visited:
+        return
+    visited.add(id(obj))
+
+    if isinstance(obj, dict):
+        items = [(str(k), v) for k, v in obj.items()]
+    elif isinstance(obj, (list, tuple)):
+        items = [(str(k), v) for k, v in enumerate(obj)]
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        items = list(vars(obj).items())
+    else:
+        return
+
+    for name, value in items:
+        key = f"{prefix}.{name}" if prefix else name
+        _collect(value, key, depth - 1, buffers, visited)
+
+
+class MemoryHook(profiler.Hook):
+    """
+    Peak and retained memory of each timed stage.
+
+    tracemalloc measures the peak (since entering the stage) and the retained
+    memory (allocated but not freed by the stage) of Python and NumPy heap
+    allocations; memory maps are not traced. After each stage, the NumPy
+    arrays of the watched objects are accounted by array_bytes.
+
+    tracemalloc has a single peak per process, thus stages running in other
+    threads at the same time are mixed up.
+
+    Usage
+    ----------
+    hook = memory.enable(mwf)
+    mwf.load_data(...)
+    print(hook.report())
+    """
+
+    def __init__(self) -> None:
+        self.records = {}  # path -> list of (peak, peak increase, retained)
+        self.arrays = {}  # path -> array_bytes of the watched objects after it
+        self.watched = []
+        self._stack = []  # [start, peak] of the open stages
+
+        # state before enable(), restored by disable()
+        self._was_profiling = False
+        self._was_tracing = False
+
+    def watch(self, obj) -> None:
+        """Account the arrays of obj after every stage."""
+        self.watched.append(obj)
+
+    def enter(self, path: tuple) -> None:
+        self.records.setdefault(path, [])
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        self._stack.append([current, current])
+        tracemalloc.reset_peak()
+
+    def exit(self, path: tuple) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        start, stage_peak = self._stack.pop()
+        stage_peak = max(stage_peak, peak)
+
+        # the peak of the enclosing stage includes this one
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], stage_peak)
+        tracemalloc.reset_peak()
+
+        self.records[path].append((stage_peak, stage_peak - start, current - start))
+        watched = self.watched[0] if len(self.watched) == 1 else self.watched
+        self.arrays[path] = array_bytes(watched)
+
+    def summary(self) -> dict:
+        """
+        Memory of each stage in bytes.
+
+        Returns
+        -------
+        summary: dict
+            {"a/b": dict(count, peak, peak_increase, retained, arrays, mapped)}
+            with the maximum peaks over calls, the total retained memory and
+            the array bytes (heap and memory-mapped) after the last call
+
+        """
+        out = {}
+        for path, rec in self.records.items():
+            if not rec:
+                continue
+            rec = np.asarray(rec)
+            arrays = self.arrays.get(path, {})
+            out["/".join(path)] = dict(
+                count=len(rec),
+                peak=int(rec[:, 0].max()),
+                peak_increase=int(rec[:, 1].max()),
+                retained=int(rec[:, 2].sum()),
+                arrays=sum(b for b, mapped in arrays.values() if not mapped),
+                mapped=sum(b for b, mapped in arrays.values() if mapped),
+            )
+        return out
+
+    def report(self, top: int = 5) -> str:
+        """Format the summary as a table, with the largest arrays at the end."""
+        mb = 2**20
+        lines = [
+            f"{'stage':<32} {'peak':>9} {'+peak':>9} {'retained':>9} "
+            f"{'arrays':>9} {'mapped':>9}  [MB]"
+        ]
+        for name, s in self.summary().items():
+            *parents, leaf = name.split("/")
+            label = "  " * len(parents) + leaf
+            lines.append(
+                f"{label:<32} {s['peak'] / mb:>9.1f} "
+                f"{s['peak_increase'] / mb:>9.1f} {s['retained'] / mb:>9.1f} "
+                f"{s['arrays'] / mb:>9.1f} {s['mapped'] / mb:>9.1f}"
+            )
+
+        # largest arrays after the last stage
+        if self.arrays:
+            last = list(self.arrays.values())[-1]
+            largest = sorted(last.items(), key=lambda item: -item[1][0])[:top]
+            lines.append("largest arrays [MB]:")
+            for name, (nbytes, mapped) in largest:
+                mapped = " (mapped)" if mapped else ""
+                lines.append(f"  {nbytes / mb:>9.1f}{mapped:<9} {name}")
+
+        return "\n".join(lines)
+
+
+def enable(*objs) -> MemoryHook:
+    """Start tracemalloc and profiling, and register a hook watching objs."""
+    hook = MemoryHook()
+    hook._was_profiling = profiler.is_enabled()
+    hook._was_tracing = tracemalloc.is_tracing()
+
+    if not hook._was_tracing:
+        tracemalloc.start()
+    profiler.enable()
+
+    for obj in objs:
+        hook.watch(obj)
+    profiler.registry.hooks.append(hook)
+    return hook
+
+
+def disable(hook: MemoryHook) -> None:
+    """Unregister the hook, and stop tracemalloc and profiling unless they were on."""
+    profiler.registry.hooks.remove(hook)
+    if not hook._was_tracing:
+        tracemalloc.stop()
+    if not hook._was_profiling:
+        profiler.disable()
@@ -0,0 +1,213 @@
+"""profiler: hierarchical stage timers."""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# timers are no-ops unless enabled, by enable() or MWF_PROFILE=1
+_enabled = os.environ.get("MWF_PROFILE", "") not in ("", "0")
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class Hook:
+    """
+    Base class of profiling hooks, called around every timed stage.
+
+    path is the tuple of names of the enclosing stages and the stage itself.
+    Hooks are called in order of registration on enter and in reverse order
+    on exit, outside the timed interval.
+    """
+
+    def enter(self, path: tuple) -> None:
+        pass
+
+    def exit(self, path: tuple) -> None:
+        pass
+
+
+class Registry:
+    """
+    Elapsed times of all timed stages, aggregated by their call path.
+
+    Each thread has its own stack of stages, so stages of a worker thread
+    form their own trees.
+    """
+
+    def __init__(self) -> None:
+        self.times = {}  # path -> list of elapsed times (s)
+        self.hooks = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def open(self, path: tuple) -> None:
+        """Register a stage on entry, so that stages are listed in call order."""
+        with self._lock:
+            self.times.setdefault(path, [])
+
+    def add(self, path: tuple, elapsed: float) -> None:
+        with self._lock:
+            self.times.setdefault(path, []).append(elapsed)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.times.clear()
+
+    def summary(self) -> dict:
+        """
+        Statistics of each stage.
+
+        Returns
+        -------
+        summary: dict
+            {"a/b": dict(count, total, self, min, max, mean, p50, p90, p99)}
+            in seconds and in call order, where self excludes the time of
+            nested stages
+
+        """
+        with self._lock:
+            times = {path: np.asarray(t) for path, t in self.times.items() if t}
+
+        out = {}
+        for path, t in times.items():
+            children = sum(
+                c.sum()
+                for p, c in times.items()
+                if len(p) == len(path) + 1 and p[:-1] == path
+            )
+            p50, p90, p99 = np.percentile(t, [50, 90, 99])
+            out["/".join(path)] = dict(
+                count=len(t),
+                total=float(t.sum()),
+                self=float(t.sum() - children),
+                min=float(t.min()),
+                max=float(t.max()),
+                mean=float(t.mean()),
+                p50=float(p50),
+                p90=float(p90),
+                p99=float(p99),
+            )
+        return out
+
+    def report(self) -> str:
+        """Format the summary as a table, nested stages are indented."""
+        lines = [
+            f"{'stage':<32} {'count':>6} {'total [s]':>10} {'self [s]':>9} "
+            f"{'mean [ms]':>10} {'p90 [ms]':>9} {'max [ms]':>9}"
+        ]
+        for name, s in self.summary().items():
+            *parents, leaf = name.split("/")
+            label = "  " * len(parents) + leaf
+            lines.append(
+                f"{label:<32} {s['count']:>6} {s['total']:>10.4f} "
+                f"{s['self']:>9.4f} {s['mean'] * 1e3:>10.3f} "
+                f"{s['p90'] * 1e3:>9.3f} {s['max'] * 1e3:>9.3f}"
+            )
+        return "\n".join(lines)
+
+    def to_json(self, path: str) -> None:
+        """Write the summary as JSON."""
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=1)
+
+    def collapsed(self) -> str:
+        """
+        Self times in the collapsed stack format of flame graph tools.
+
+        Each line is "a;b;c <microseconds>", e.g., for flamegraph.pl or
+        speedscope.
+        """
+        return "\n".join(
+            f"{name.replace('/', ';')} {round(s['self'] * 1e6)}"
+            for name, s in self.summary().items()
+            if s["self"] > 0
+        )
+
+    def to_collapsed(self, path: str) -> None:
+        """Write the collapsed stacks to a file."""
+        with open(path, "w") as f:
+            f.write(self.collapsed() + "\n")
+
+
+registry = Registry()
+
+
+class timer:
+    """
+    Nestable stage timer, used as a context manager or a decorator.
+
+    Usage
+    ----------
+    with profiler.timer("transform"):
+        ...
+
+    @profiler.timer()
+    def run(self, mu): ...
+    """
+
+    def __init__(self, name: str | None = None) -> None:
+        self.name = name
+
+    def __enter__(self) -> timer:
+        if not _enabled:
+            self.path = None
+            return self
+
+        stack = registry.stack
+        stack.append(self.name)
+        self.path = tuple(stack)
+        registry.open(self.path)
+        for hook in registry.hooks:
+            hook.enter(self.path)
+        self.st = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self.path is None:
+            return
+
+        elapsed = time.perf_counter() - self.st
+        for hook in reversed(registry.hooks):
+            hook.exit(self.path)
+        registry.add(self.path, elapsed)
+        registry.stack.pop()
+
+    def __call__(self, func: Callable) -> Callable:
+        name = self.name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with timer(name):
+                return func(*args, **kwargs)
+
+        return wrapper
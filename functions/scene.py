@@ -0,0 +1,252 @@
+"""scene: synthetic multichannel acoustic scenes."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import soundfile as sf
+from numpy.random import default_rng
+
+if TYPE_CHECKING:
+    from numpy.random import Generator
+    from numpy.typing import NDArray
+
+# speed of sound (m/s)
+sound_speed = 343.0
+
+
+def fast_len(n: int) -> int:
+    """Return the smallest 5-smooth number (fast FFT length) not less than n."""
+    best = 1 << max(n - 1, 0).bit_length()
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # smallest power-of-two multiple of p35 not less than n
+            m = p35 << max(-(-n // p35) - 1, 0).bit_length()
+            best = min(best, m)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def fft_convolve(x: NDArray[np.float64], h: NDArray[np.float64]) -> NDArray[np.float64]:
+    """
+    Linear convolution along the last axis by FFT.
+
+    Parameters
+    ----------
+    x: array_like (..., n_samples)
+        Signals
+    h: array_like (..., length)
+        Impulse responses, broadcast against the leading axes of x
+
+    Return
+    ----------
+    y: array_like (..., n_samples + length - 1)
+        Convolved signals
+
+    """
+    n = x.shape[-1] + h.shape[-1] - 1
+    n_fft = fast_len(n)
+    Y = np.fft.rfft(x, n_fft) * np.fft.rfft(h, n_fft)
+    return np.fft.irfft(Y, n_fft)[..., :n]
+
+
+def linear_array(n_ch: int, spacing: float = 0.05) -> NDArray[np.float64]:
+    """Positions (n_ch, 3) of a uniform linear array centered at the origin."""
+    pos = np.zeros((n_ch, 3))
+    pos[:, 0] = (np.arange(n_ch) - (n_ch - 1) / 2) * spacing
+    return pos
+
+
+def room_impulse_responses(
+    src_pos: NDArray[np.float64],
+    mic_pos: NDArray[np.float64],
+    fs: int,
+    rt60: float,
+    rg: Generator,
+) -> NDArray[np.float64]:
+    """
+    Generate multichannel room impulse responses.
+
+    Each response is a direct path (fractional delay and 1/r attenuation)
+    followed by an exponentially decaying diffuse tail, which is independent
+    across channels. The tail carries the energy of the direct path at 1 m,
+    i.e., the critical distance is about 1 m.
+
+    Parameters
+    ----------
+    src_pos: array_like (n_src, 3)
+        Source positions (m)
+    mic_pos: array_like (n_ch, 3)
+        Microphone positions (m)
+    fs: int
+        Sampling frequency
+    rt60: float
+        Reverberation time (s)
+    rg: Generator
+        Random number generator
+
+    Return
+    ----------
+    h: array_like (n_src, n_ch, length)
+        Impulse responses, length covers the direct paths and rt60
+
+    """
+    dist = np.linalg.norm(src_pos[:, None, :] - mic_pos[None, :, :], axis=-1)
+    delay = dist / sound_speed * fs
+    length = int(np.ceil(delay.max() + rt60 * fs)) + 1
+
+    # direct path: fractional delay in the frequency domain
+    n_fft = fast_len(2 * length)
+    f = np.arange(n_fft // 2 + 1) / n_fft
+    H = np.exp(-2j * np.pi * f * delay[:, :, None]) / dist[:, :, None]
+    h = np.fft.irfft(H, n_fft)[:, :, :length]
+
+    # diffuse tail starting at the direct path, -60 dB after rt60
+    t = np.arange(length) - delay[:, :, None]
+    tail = rg.standard_normal(h.shape) * np.exp(-6.91 * t / (rt60 * fs))
+    tail[t < 0] = 0
+    tail /= np.sqrt(np.sum(np.square(tail), axis=-1, keepdims=True))
+
+    return h + tail
+
+
+def speech_like(
+    n_src: int, n_samples: int, fs: int, rg: Generator
+) -> NDArray[np.float64]:
+    """
+    Generate speech-like signals of unit power.
+
+    Pink noise is modulated by a random syllabic envelope (below 8 Hz) with
+    pauses, similar to the long-term spectrum and on/off pattern of speech.
+
+    Return
+    ----------
+    s: array_like (n_src, n_samples)
+        Signals
+
+    """
+    f = np.fft.rfftfreq(n_samples, 1 / fs)
+
+    # pink noise
+    W = np.fft.rfft(rg.standard_normal((n_src, n_samples)))
+    W[:, 1:] /= np.sqrt(f[1:] / f[1])
+    W[:, 0] = 0
+    s = np.fft.irfft(W, n_samples)
+
+    # syllabic envelope, negative parts are pauses
+    E = np.fft.rfft(rg.standard_normal((n_src, n_samples)))
+    E[:, f > 8] = 0
+    env = np.maximum(np.fft.irfft(E, n_samples), 0)
+
+    s *= env
+    return s / np.sqrt(np.mean(np.square(s), axis=-1, keepdims=True))
+
+
+def diffuse_noise(
+    mic_pos: NDArray[np.float64], n_samples: int, fs: int, rg: Generator
+) -> NDArray[np.float64]:
+    """
+    Generate spherically isotropic (diffuse) noise of unit power.
+
+    White noise spectra are mixed by the Cholesky factor of the coherence
+    sinc(2 f d / c) for all frequency bins at once.
+
+    Return
+    ----------
+    n: array_like (n_ch, n_samples)
+        Noise
+
+    """
+    n_ch = mic_pos.shape[0]
+    f = np.fft.rfftfreq(n_samples, 1 / fs)
+    d = np.linalg.norm(mic_pos[:, None, :] - mic_pos[None, :, :], axis=-1)
+
+    # coherence matrices (n_freq, n_ch, n_ch), slightly loaded to be definite
+    coh = np.sinc(2 * f[:, None, None] * d / sound_speed) + 1e-6 * np.eye(n_ch)
+    L = np.linalg.cholesky(coh)
+
+    W = rg.standard_normal((len(f), n_ch, 2)).view(complex)
+    n = np.fft.irfft((L @ W)[:, :, 0].T, n_samples)
+    return n / np.sqrt(np.mean(np.square(n)))
+
+
+def make_scene(
+    out_dir: str,
+    n_ch: int = 4,
+    duration: float = 10.0,
+    n_interf: int = 2,
+    fs: int = 16000,
+    rt60: float = 0.3,
+    diffuse_level: float | None = -20.0,
+    spacing: float = 0.05,
+    seed: int = 0,
+) -> tuple[str, list]:
+    """
+    Generate a scene and write it in the layout read by MWF.load_data.
+
+    The target and the interferers are speech-like point sources at random
+    directions, 1-3 m away from a linear array, convolved with generated
+    room impulse responses. Diffuse noise, if diffuse_level (dB relative to
+    the target) is given, is written as an additional interferer.
+
+    Parameters
+    ----------
+    out_dir: str
+        output directory, the files are out_dir/target/target.wav and
+        out_dir/interf/*.wav
+
+    Return
+    ----------
+    target_path: str
+        path to the target signal
+    interf_paths: list of str
+        paths to the interferer signals
+
+    """
+    rg = default_rng(seed)
+    n_samples = int(duration * fs)
+    n_src = 1 + n_interf
+
+    # geometry
+    mic_pos = linear_array(n_ch, spacing)
+    azimuth = rg.uniform(0, np.pi, n_src)
+    radius = rg.uniform(1, 3, n_src)
+    src_pos = np.stack(
+        [radius * np.cos(azimuth), radius * np.sin(azimuth), np.zeros(n_src)], axis=1
+    )
+
+    # point sources, all sources and channels in one batched convolution
+    h = room_impulse_responses(src_pos, mic_pos, fs, rt60, rg)
+    dry = speech_like(n_src, n_samples, fs, rg)
+    images = fft_convolve(dry[:, None, :], h)[:, :, :n_samples]
+
+    # diffuse noise
+    if diffuse_level is not None:
+        noise = diffuse_noise(mic_pos, n_samples, fs, rg)
+        power = np.mean(np.square(images[0]))
+        noise *= np.sqrt(power * 10 ** (diffuse_level / 10))
+        images = np.concatenate([images, noise[None]], axis=0)
+
+    # common gain to avoid clipping of the mixture
+    images *= 0.9 / np.max(np.abs(np.sum(images, axis=0)))
+
+    # write
+    out = Path(out_dir)
+    (out / "target").mkdir(parents=True, exist_ok=True)
+    (out / "interf").mkdir(parents=True, exist_ok=True)
+    names = ["target/target"] + [f"interf/interf{k}" for k in range(n_interf)]
+    if diffuse_level is not None:
+        names.append("interf/diffuse")
+
+    paths = []
+    for name, img in zip(names, images):
+        path = str(out / f"{name}.wav")
+        sf.write(path, img.T, fs, subtype="FLOAT")
+        paths.append(path)
+
+    return paths[0], paths[1:]
@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 import time
 
+from functions import profiler
+
 
 class tictoc:
     """
     MATLAB like tic toc functions
 
+    The elapsed time is also recorded in functions.profiler.registry under
+    the tag when profiling is enabled; use profiler.timer for nested stages.
+
     parameters
     ----------
     tag: str, optional
@@ -20,17 +25,18 @@ class tictoc:
 
     def __init__(self, tag=""):
         self.st = None
+        self.name = tag or "tictoc"
         self.tag = tag if tag == "" else tag + ": "
 
     def tic(self):
-        self.st = time.time()
+        self.st = time.perf_counter()
 
     def toc(self):
         if self.st is not None:
-            print(
-                "{}Elapsed time is {:.6f} seconds.".format(
-                    self.tag, time.time() - self.st
-                )
-            )
+            elapsed = time.perf_counter() - self.st
+            if profiler.is_enabled():
+                path = (*profiler.registry.stack, self.name)
+                profiler.registry.add(path, elapsed)
+            print("{}Elapsed time is {:.6f} seconds.".format(self.tag, elapsed))
         else:
             print("tic() must be called before calling toc().")
@@ -7,6 +7,8 @@ from typing import TYPE_CHECKING
 import numpy as np
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+
     from numpy.typing import NDArray
 
 
@@ -33,53 +35,166 @@ def set_snr(si: NDArray[np.float64], ni: NDArray[np.float64], snr: float) -> tup
         Coefficient used for amplitude modification
 
     """
-    n_samples, n_ch = si.shape
-
-    # Check shape
-    transposed_input = False
-    if n_ch > n_samples:
-        transposed_input = True
-        si = si.T
-        ni = ni.T
-        n_samples, n_ch = si.shape
-
     # main
-    ss_s, ss_n = 0, 0
-    for c in range(n_ch):
-        ss_s += si[:, c].T @ si[:, c]
-        ss_n += ni[:, c].T @ ni[:, c]
-
-    in_snr = 10 * np.log10(ss_s / ss_n)
-    coef = 10 ** ((in_snr - snr) / 20)
+    coef = snr_gain(si, ni, snr)
 
     # out
     no = ni * coef
-    if transposed_input:
-        no = no.T
 
     return no, coef
 
 
+def snr_gain(
+    si: NDArray[np.float64], ni: NDArray[np.float64], snr: float, blocksize: int = 2**16
+) -> float:
+    """
+    Return the coefficient of the noise giving the desired SNR.
+
+    The energies are accumulated block by block along the first axis, so the
+    signals may be memory-mapped and nothing of their size is allocated.
+
+    Parameters
+    ----------
+    si: array_like (n_samples, n_ch)
+        Signal
+    ni: array_like (n_samples, n_ch)
+        Noise
+    snr: int or float
+        Desired SNR
+    blocksize: int
+        Number of samples per block
+
+    Return
+    ----------
+    coef: float
+        Coefficient for amplitude modification of the noise
+
+    """
+    # total energy over all samples and channels
+    ss_s, ss_n = 0.0, 0.0
+    for b in blocks(si.shape[0], blocksize):
+        ss_s += float(np.vdot(si[b], si[b]))
+        ss_n += float(np.vdot(ni[b], ni[b]))
+
+    in_snr = 10 * np.log10(ss_s / ss_n)
+    return float(10 ** ((in_snr - snr) / 20))
+
+
+def blocks(n: int, size: int) -> Iterator[slice]:
+    """Yield slices splitting range(n) into blocks of the given size."""
+    for head in range(0, n, max(size, 1)):
+        yield slice(head, min(head + size, n))
+
+
 def calc_scm(X: NDArray[np.complex64]) -> NDArray[np.complex64]:
     """Compute spatial covariance matrix."""
     V = X @ X.conj().swapaxes(1, 2)
     return V / X.shape[2]
 
 
-def calc_rtf(X: NDArray[np.complex64]) -> NDArray[np.complex64]:
+def calc_rtf(
+    X: NDArray[np.complex64],
+    method: str = "eigh",
+    a0: NDArray[np.complex64] | None = None,
+    n_iter: int = 10,
+) -> NDArray[np.complex64]:
     """Compute relative transfer functions."""
-    n_freq, n_ch, n_frame = X.shape
-    V = calc_scm(X)
+    return rtf_from_scm(calc_scm(X), method, a0, n_iter)
+
+
+def rtf_from_scm(
+    V: NDArray[np.complex64],
+    method: str = "eigh",
+    a0: NDArray[np.complex64] | None = None,
+    n_iter: int = 10,
+) -> NDArray[np.complex64]:
+    """
+    Compute relative transfer functions from spatial covariance matrices.
+
+    The transfer function is the principal eigenvector of each matrix.
+
+    Parameters
+    ----------
+    V: array_like (n_freq, n_ch, n_ch)
+        Spatial covariance matrices
+    method: str
+        "eigh": Hermitian eigendecomposition of all frequency bins at once
+        "power": power iteration, cheaper for large numbers of channels
+    a0: array_like (n_freq, n_ch), optional
+        Initial vectors of the power iteration, e.g., the previous solution.
+        The first columns of V are used if None.
+    n_iter: int
+        Number of power iterations
 
+    Return
+    ----------
+    a: array_like (n_freq, n_ch)
+        Relative transfer functions
+
+    """
     # Transfer function
-    a = np.zeros([n_freq, n_ch], dtype="complex64")
-    for f in range(n_freq):
-        val, vec = np.linalg.eig(np.squeeze(V[f, :, :]))
-        idx = val.argsort()[-1]
-        a[f, :] = vec[:, idx]
+    if method == "eigh":
+        _, vec = np.linalg.eigh(V)
+        a = vec[:, :, -1]
+    elif method == "power":
+        a = V[:, :, 0] if a0 is None else a0
+        for _ in range(n_iter):
+            a = (V @ a[:, :, np.newaxis])[:, :, 0]
+            a /= np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-30)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    a = a.astype(V.dtype)
 
     # Relative transfer function
     a[:, 0] += (a[:, 0] == 0) * 0.001
     a /= a[:, 0, np.newaxis]
 
     return a
+
+
+class RecursiveInverse:
+    """
+    Track the inverse of a recursively averaged covariance matrix.
+
+    V <- alpha V + (1 - alpha) x x^H is tracked for all frequency bins at once,
+    and its inverse is updated by the Sherman-Morrison formula at O(F C^2) per
+    frame. V^-1 is recomputed from V every n_anchor updates to control
+    numerical drift.
+
+    Usage
+    ----------
+    tracker = RecursiveInverse(V0, alpha=0.99)
+    tracker.update(x)  # x: (n_freq, n_ch)
+    tracker.P          # V^-1: (n_freq, n_ch, n_ch)
+    """
+
+    def __init__(
+        self, V0: NDArray[np.complex64], alpha: float = 0.99, n_anchor: int = 100
+    ) -> None:
+        self.alpha = alpha
+        self.n_anchor = n_anchor
+        self.V = V0.copy()
+        self.P = np.linalg.inv(V0)
+        self.n_update = 0
+
+    def update(self, x: NDArray[np.complex64]) -> None:
+        """Add a frame x of shape (n_freq, n_ch)."""
+        beta = 1 - self.alpha
+        self.V = self.alpha * self.V + beta * calc_scm(x[:, :, np.newaxis])
+        self.n_update += 1
+
+        if self.n_update % self.n_anchor == 0:
+            self.P = np.linalg.inv(self.V)
+            return
+
+        # (alpha V + beta x x^H)^-1
+        #   = (P - beta P x x^H P / (alpha + beta x^H P x)) / alpha
+        Px = (self.P @ x[:, :, np.newaxis])[:, :, 0]
+        xPx = np.sum(x.conj() * Px, axis=1).real
+        gain = beta / (self.alpha + beta * xPx)
+        self.P = (
+            self.P - gain[:, None, None] * Px[:, :, None] * Px[:, None, :].conj()
+        ) / self.alpha
+
+        # keep P Hermitian
+        self.P = (self.P + self.P.conj().swapaxes(1, 2)) / 2
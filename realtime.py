@@ -0,0 +1,304 @@
+"""Real-time multichannel Wiener filter with sounddevice streams."""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from MWF import OnlineMWF
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from numpy.typing import NDArray
+
+
+class RingBuffer:
+    """Bounded FIFO of multichannel samples."""
+
+    def __init__(self, capacity: int, n_ch: int) -> None:
+        self.buf = np.zeros((capacity, n_ch))
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def write(self, x: NDArray[np.float64]) -> int:
+        """Append samples, return the number of samples dropped due to overflow."""
+        capacity = self.buf.shape[0]
+        n_drop = max(len(x) - (capacity - self.size), 0)
+        x = x[: len(x) - n_drop]
+
+        idx = (self.head + self.size + np.arange(len(x))) % capacity
+        self.buf[idx] = x
+        self.size += len(x)
+
+        return n_drop
+
+    def read(self, n: int) -> NDArray[np.float64]:
+        """Pop up to n samples."""
+        n = min(n, self.size)
+        idx = (self.head + np.arange(n)) % self.buf.shape[0]
+        self.head = (self.head + n) % self.buf.shape[0]
+        self.size -= n
+
+        return self.buf[idx]
+
+
+class RealtimeMWF:
+    """
+    Duplex processing: input block -> block-based MWF -> output block.
+
+    Input blocks are queued in a bounded ring buffer and processed in hops of
+    frsft samples by OnlineMWF; the enhanced samples are queued in another
+    ring buffer and played out. Overflows, underflows (xruns) and latency are
+    counted in self.stats.
+    """
+
+    def __init__(
+        self,
+        mwf: OnlineMWF,
+        capacity: int | None = None,
+        noise_hops: int = 0,
+        vad: Callable[[NDArray[np.float64]], bool] | None = None,
+    ) -> None:
+        """
+        Initialize.
+
+        Parameters
+        ----------
+        mwf: OnlineMWF
+            block-based MWF
+
+        capacity: int
+            size of each ring buffer (samples), 8 hops by default
+
+        noise_hops: int
+            the first noise_hops hops are treated as noise only (calibration)
+
+        vad: callable, optional
+            function returning True if a hop of shape (frsft, n_ch) is noise only
+
+        """
+        self.mwf = mwf
+        self.hop = mwf.plan.frsft
+        capacity = 8 * self.hop if capacity is None else capacity
+        self.noise_hops = noise_hops
+        self.vad = vad
+
+        self._in = RingBuffer(capacity, mwf.n_ch)
+        self._out = RingBuffer(capacity, 1)
+
+        self.stats = dict(
+            callbacks=0,
+            input_overflows=0,
+            output_underflows=0,
+            dropped_samples=0,
+            underrun_samples=0,
+            max_callback_time=0.0,
+            total_callback_time=0.0,
+            max_queued_samples=0,
+        )
+
+    def callback(self, indata, outdata, frames, time_info, status) -> None:
+        """Callback of sounddevice.Stream."""
+        st = time.perf_counter()
+        stats = self.stats
+
+        # xruns reported by the audio device
+        stats["input_overflows"] += bool(getattr(status, "input_overflow", False))
+        stats["output_underflows"] += bool(getattr(status, "output_underflow", False))
+
+        # input
+        stats["dropped_samples"] += self._in.write(indata)
+
+        # block-based MWF
+        while len(self._in) >= self.hop:
+            hop = self._in.read(self.hop)
+            if self.vad is not None:
+                noise_only = self.vad(hop)
+            else:
+                noise_only = self.mwf.n_hop < self.noise_hops
+            stats["dropped_samples"] += self._out.write(
+                self.mwf.process(hop, noise_only)[:, None]
+            )
+
+        # output, zeros if not enough samples are ready
+        stats["max_queued_samples"] = max(stats["max_queued_samples"], len(self._out))
+        y = self._out.read(frames)
+        outdata[: len(y)] = y
+        outdata[len(y) :] = 0
+        if len(y) < frames:
+            stats["output_underflows"] += 1
+            stats["underrun_samples"] += frames - len(y)
+
+        # timing
+        elapsed = time.perf_counter() - st
+        stats["callbacks"] += 1
+        stats["total_callback_time"] += elapsed
+        stats["max_callback_time"] = max(stats["max_callback_time"], elapsed)
+
+    def stream(self, fs: int, device=None):
+        """Return a sounddevice duplex stream driven by this processor."""
+        import sounddevice as sd
+
+        return sd.Stream(
+            samplerate=fs,
+            blocksize=self.hop,
+            device=device,
+            channels=(self.mwf.n_ch, 1),
+            callback=self.callback,
+        )
+
+    def report(self, fs: int) -> str:
+        """Summarize xrun and latency counters."""
+        stats = self.stats
+        n = max(stats["callbacks"], 1)
+        latency = self.mwf.latency + stats["max_queued_samples"]
+        return "\n".join(
+            [
+                f"callbacks: {stats['callbacks']}",
+                f"xruns: {stats['input_overflows']} input overflows, "
+                f"{stats['output_underflows']} output underflows",
+                f"dropped samples: {stats['dropped_samples']}, "
+                f"underrun samples: {stats['underrun_samples']}",
+                "callback time: "
+                f"{stats['total_callback_time'] / n * 1e3:.3f} ms (mean), "
+                f"{stats['max_callback_time'] * 1e3:.3f} ms (max), "
+                f"budget {self.hop / fs * 1e3:.3f} ms",
+                f"latency: {latency} samples ({latency / fs * 1e3:.1f} ms) + device",
+            ]
+        )
+
+
+class CallbackFlags:
+    """Stand-in for sounddevice.CallbackFlags."""
+
+    input_overflow = False
+    output_underflow = False
+
+    def __bool__(self) -> bool:
+        return False
+
+
+class FileStream:
+    """
+    File-backed stand-in for sounddevice.Stream.
+
+    The callback is driven by a thread that feeds blocks of data as input and
+    collects the output in self.output. speed = 1 runs at wall-clock pace,
+    speed > 1 faster than real time, and speed = 0 as fast as possible.
+    """
+
+    def __init__(
+        self,
+        data: NDArray[np.float64],
+        samplerate: int,
+        blocksize: int,
+        callback: Callable,
+        n_out: int = 1,
+        speed: float = 1.0,
+    ) -> None:
+        self.data = data
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.speed = speed
+        self.output = np.zeros((data.shape[0] // blocksize * blocksize, n_out))
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.wait()
+
+    def close(self) -> None:
+        self.stop()
+
+    def wait(self) -> None:
+        """Wait until all data is consumed."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> FileStream:
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        period = self.blocksize / self.samplerate / self.speed if self.speed > 0 else 0
+        st = time.perf_counter()
+        status = CallbackFlags()
+
+        for k, head in enumerate(range(0, self.output.shape[0], self.blocksize)):
+            if self._stop.is_set():
+                break
+
+            block = slice(head, head + self.blocksize)
+            self.callback(
+                self.data[block], self.output[block], self.blocksize, None, status
+            )
+
+            # keep the pace
+            delay = st + (k + 1) * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file", help="process a wav file instead of the audio device")
+    parser.add_argument("--out", default="out/y_realtime.wav", help="output of --file")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="pace of --file, 0: max"
+    )
+    parser.add_argument(
+        "--channels", type=int, default=2, help="input channels (device)"
+    )
+    parser.add_argument("--fs", type=int, default=16000, help="sampling rate (device)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds (device)")
+    parser.add_argument("--frlen", type=int, default=1024)
+    parser.add_argument("--dtype", default="float64", choices=["float32", "float64"])
+    parser.add_argument(
+        "--noise-sec", type=float, default=1.0, help="initial noise only"
+    )
+    args = parser.parse_args()
+
+    if args.file:
+        import soundfile as sf
+
+        data, fs = sf.read(args.file, always_2d=True)
+        n_ch = data.shape[1]
+    else:
+        fs, n_ch = args.fs, args.channels
+
+    mwf = OnlineMWF(n_ch, frlen=args.frlen, dtype=args.dtype)
+    noise_hops = int(args.noise_sec * fs / mwf.plan.frsft)
+    proc = RealtimeMWF(mwf, noise_hops=noise_hops)
+
+    if args.file:
+        stream = FileStream(data, fs, proc.hop, proc.callback, speed=args.speed)
+        stream.start()
+        stream.wait()
+        sf.write(args.out, stream.output[mwf.latency :, 0], fs)
+    else:
+        with proc.stream(fs):
+            time.sleep(args.duration)
+
+    print(proc.report(fs))